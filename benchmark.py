@@ -0,0 +1,353 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import configparser
+from datetime import datetime, timedelta
+
+# Qt has to be headless before the first widget is created
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import pymysql
+from PyQt5.QtCore import Qt, QThreadPool
+from PyQt5.QtWidgets import QApplication
+
+import main
+
+SEED_BATCH_SIZE = 5000
+WORDS = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel", "india", "juliet", "kilo", "lima",
+         "mike", "november", "oscar", "papa", "quebec", "romeo", "sierra", "tango"]
+
+# The columns the app reads from each table, typed the way its result handling expects
+PACKAGE_COLUMNS = ("Col1 INT NOT NULL, Col2 BIT(1), Col3 INT NOT NULL, Col4 VARCHAR(255), Col5 DATETIME, "
+                   "Col6 BIT(1), Col7 TINYINT, PRIMARY KEY (Col3, Col1), KEY (Col1)")
+TABLES = {
+    'table1': "Col1 INT NOT NULL, Col2 VARCHAR(32), KEY (Col1)",
+    'table2': ("Col1 INT NOT NULL PRIMARY KEY, Col2 INT, Col3 DATETIME, Col4 INT, Col5 DATETIME, Col6 INT, "
+               "KEY (Col2), KEY (Col3), KEY (Col4)"),
+    'table3': "Col1 INT NOT NULL PRIMARY KEY, Col2 BIT(1), Col3 BIT(1), Col4 BIT(1)",
+    'table4': "Col1 INT NOT NULL PRIMARY KEY, Col2 VARCHAR(64), Col3 VARCHAR(8)",
+    'table5': PACKAGE_COLUMNS,
+    'table6': PACKAGE_COLUMNS,
+    'table7': "Col1 INT, Col2 BIT(1), Col3 INT, Col4 VARCHAR(64), Col5 DATETIME, Col6 BIT(1), KEY (Col3)",
+    'table8': "Col1 INT, Col3 INT, Col5 DATETIME, KEY (Col3)",
+    'table9': "Col2 INT, Col3 INT, Col4 INT, Col5 DATETIME, Col6 INT, KEY (Col3)",
+    'table10': "Col1 INT, Col2 INT, Col3 INT, Col5 DATETIME, KEY (Col3)",
+    'table11': "Col1 INT, Col2 INT, Col3 INT, Col4 VARCHAR(64), Col5 DATETIME, KEY (Col3)",
+}
+
+
+def synthetic_rows(table, scale, rng, now):
+    # scale rows per table; every package id has about 20 rows in each table keyed on it
+    packages = max(scale // 20, 1)
+    leagues = max(scale // 200, 1)
+
+    def package():
+        return rng.randrange(packages)
+
+    def recent():
+        return now - timedelta(minutes=rng.randrange(30 * 24 * 60))
+
+    def upcoming():
+        return now + timedelta(minutes=rng.randrange(-7 * 24 * 60, 30 * 24 * 60))
+
+    def flag():
+        return rng.getrandbits(1)
+
+    for row_id in range(scale):
+        if table == 'table1':
+            yield row_id % max(scale // 2, 1), rng.choice(WORDS)
+        elif table == 'table2':
+            yield row_id, rng.randrange(20), upcoming(), rng.randrange(leagues), upcoming(), rng.randrange(12)
+        elif table == 'table3':
+            yield row_id, flag(), flag(), flag()
+        elif table == 'table4':
+            yield row_id, f"{rng.choice(WORDS)} {row_id}", rng.choice(WORDS)[:2]
+        elif table in ('table5', 'table6'):
+            description = " ".join(rng.sample(WORDS, 3)) + f" {row_id}"
+            yield row_id, flag(), package(), description, upcoming(), flag(), flag()
+        elif table == 'table7':
+            yield rng.randrange(scale), flag(), package(), rng.choice(WORDS), recent(), flag()
+        elif table == 'table8':
+            yield rng.randrange(scale), package(), upcoming()
+        elif table == 'table9':
+            # Subscriptions on a league, a location or a whole sport
+            level = rng.randrange(3)
+            yield (rng.randrange(20), package(), rng.randrange(leagues) if level == 0 else None, recent(),
+                   rng.randrange(12))
+        elif table == 'table10':
+            yield rng.randrange(scale), rng.randrange(100), package(), recent()
+        else:
+            yield rng.randrange(scale), rng.randrange(100), package(), rng.choice(WORDS), recent()
+
+
+def seed_database(connection_config, database, scale, seed, reseed=False):
+    # Creates the benchmark database and fills every table with scale synthetic rows, unless it already holds
+    # exactly that data set
+    connection = pymysql.connect(**dict(connection_config, database=None))
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{database}`")
+            cursor.execute(f"USE `{database}`")
+            cursor.execute("CREATE TABLE IF NOT EXISTS benchmark_seed (scale INT, seed INT)")
+            cursor.execute("SELECT scale, seed FROM benchmark_seed")
+            if not reseed and cursor.fetchone() == (scale, seed):
+                return 0.0
+
+            started = time.perf_counter()
+            rng = random.Random(seed)
+            now = datetime.now().replace(microsecond=0)
+            for table, columns in TABLES.items():
+                cursor.execute(f"DROP TABLE IF EXISTS {table}")
+                cursor.execute(f"CREATE TABLE {table} ({columns})")
+                rows = synthetic_rows(table, scale, rng, now)
+                while True:
+                    batch = [row for _, row in zip(range(SEED_BATCH_SIZE), rows)]
+                    if not batch:
+                        break
+                    cursor.executemany(f"INSERT INTO {table} VALUES ({', '.join(['%s'] * len(batch[0]))})", batch)
+                    connection.commit()
+            cursor.execute("DELETE FROM benchmark_seed")
+            cursor.execute("INSERT INTO benchmark_seed VALUES (%s, %s)", (scale, seed))
+            connection.commit()
+            return time.perf_counter() - started
+    finally:
+        connection.close()
+
+
+class BenchmarkWindow(main.MainWindow):
+    # The app pointed at the benchmark database, with exports written to a scratch folder and no message boxes
+    database_overrides = {}
+    export_folder = None
+
+    def load_database_config(self):
+        super().load_database_config()
+        self.connection_config.update(self.database_overrides)
+        self.connection_pool.connection_config.update(self.database_overrides)
+
+    def export_file_path(self, table_name, export_format):
+        return os.path.join(self.export_folder, f"{table_name}{main.EXPORT_FORMATS[export_format][1]}")
+
+    def show_export_succeeded(self, file_path, row_count, elapsed):
+        os.remove(file_path)
+
+    def show_export_failed(self, error):
+        raise error
+
+
+def wait_for_queries(app, window):
+    # Returns once every background query has finished and its result has been displayed, including follow-up
+    # queries started while displaying (e.g. the next page of a main search)
+    while True:
+        window.thread_pool.waitForDone()
+        QThreadPool.globalInstance().waitForDone()
+        app.processEvents()
+        if not window.active_workers and not window.thread_pool.activeThreadCount():
+            return
+
+
+def recorded_since(history, last):
+    # Query timings the app recorded after last, the newest entry before the run
+    stats = []
+    for item in reversed(history):
+        if item is last:
+            break
+        stats.append(item)
+    return stats
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))]
+
+
+def summarize(values):
+    milliseconds = [value * 1000 for value in values]
+    return {
+        'p50_ms': round(percentile(milliseconds, 50), 3),
+        'p90_ms': round(percentile(milliseconds, 90), 3),
+        'p99_ms': round(percentile(milliseconds, 99), 3),
+        'max_ms': round(max(milliseconds), 3),
+        'mean_ms': round(sum(milliseconds) / len(milliseconds), 3),
+    }
+
+
+def measure(app, window, name, run, setup, iterations, warmup):
+    # Wall time per run, plus the connect/execute/fetch/render split the app's own query timings recorded for
+    # the queries it ran. Peak memory comes from one extra run under tracemalloc, which would skew the timings.
+    history = window.query_metrics.history
+    timings = []
+    phases = {phase: [] for phase in main.QueryStats.PHASES}
+    for iteration in range(warmup + iterations):
+        if setup:
+            setup()
+            wait_for_queries(app, window)
+        last = history[-1] if history else None
+        started = time.perf_counter()
+        run()
+        wait_for_queries(app, window)
+        elapsed = time.perf_counter() - started
+        if iteration < warmup:
+            continue
+        timings.append(elapsed)
+        stats = recorded_since(history, last)
+        for phase in phases:
+            phases[phase].append(sum(item.timings[phase] for item in stats))
+
+    if setup:
+        setup()
+        wait_for_queries(app, window)
+    tracemalloc.start()
+    run()
+    wait_for_queries(app, window)
+    peak_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    result = {'runs': len(timings), **summarize(timings), 'peak_python_bytes': peak_bytes}
+    if any(any(values) for values in phases.values()):
+        result['phases'] = {phase: summarize(values) for phase, values in phases.items()}
+    print(f"  {name}: p50 {result['p50_ms']:.1f} ms, p90 {result['p90_ms']:.1f} ms", file=sys.stderr)
+    return result
+
+
+def run_scale(app, args, connection_config, scale):
+    print(f"{scale:,} rows per table", file=sys.stderr)
+    seed_seconds = seed_database(connection_config, args.database, scale, args.seed, args.reseed)
+    rng = random.Random(args.seed)
+    packages = max(scale // 20, 1)
+
+    # Cold start: the first search is typed as soon as the window is usable, while the warm-up is still running
+    window = BenchmarkWindow(time.perf_counter())
+    window.resize(1280, 800)
+    window.show()
+    while 'interactive' not in window.startup_timings:
+        app.processEvents()
+    window.query_numeric_info(str(rng.randrange(packages)))
+    wait_for_queries(app, window)
+    cold_start = {f'{event}_ms': round(seconds * 1000, 3) for event, seconds in window.startup_timings.items()}
+    print(f"  cold start: {cold_start}", file=sys.stderr)
+
+    table = window.result_table
+    proxy_model = table.proxy_model
+    all_rows = window.fetch_all("SELECT Col1, Col2, Col3, Col4, Col5, Col6, Col7 FROM table5;")
+    now = datetime.now()
+
+    def load_table():
+        table.clear_rows()
+        window.add_results_to_table(all_rows, "Source1")
+
+    def loaded_table():
+        # Column indexes are built in the background once rows stop arriving; wait for them like a user would
+        if table.source_model.rowCount() != len(all_rows):
+            load_table()
+        table.source_model.build_column_indexes()
+        proxy_model.clear_filters()
+        proxy_model.sort(-1)
+
+    scenarios = [
+        ('main_search_numeric', lambda: window.query_numeric_info(str(rng.randrange(packages))), None),
+        ('main_search_text', lambda: window.query_text_info(rng.choice(WORDS)), None),
+        ('infobox_option2',
+         lambda: window.query_selection_async("Option2", "Infobox1", str(rng.randrange(packages)), refresh=True),
+         None),
+        ('infobox_option3',
+         lambda: window.query_selection_async("Option3", "Infobox1", str(rng.randrange(packages)), refresh=True),
+         None),
+        ('sub_search_option1', lambda: window.query_sub_search_data("SubOption1", refresh=True), None),
+        ('sub_search_option2', lambda: window.query_sub_search_data("SubOption2", refresh=True), None),
+        ('sub_search_option3', lambda: window.query_sub_search_data("SubOption3", refresh=True), None),
+        ('table_load', load_table, None),
+        ('table_filter_text', lambda: proxy_model.set_column_filter(3, rng.choice(WORDS)), loaded_table),
+        ('table_filter_date',
+         lambda: proxy_model.set_date_range(7, main.to_timestamp(now), main.to_timestamp(now + timedelta(days=7))),
+         loaded_table),
+        ('table_sort_description', lambda: proxy_model.sort(3, Qt.DescendingOrder), loaded_table),
+        ('table_sort_date', lambda: proxy_model.sort(7, Qt.AscendingOrder), loaded_table),
+        ('export_loaded_csv', lambda: window.export_table(table, "benchmark", 'csv'), loaded_table),
+    ]
+    selected = set(args.only.split(",")) if args.only else None
+    results = {}
+    for name, run, setup in scenarios:
+        if selected is None or name in selected:
+            results[name] = measure(app, window, name, run, setup, args.iterations, args.warmup)
+
+    window.close()
+    wait_for_queries(app, window)
+    window.deleteLater()
+    return {'rows': scale, 'seed_seconds': round(seed_seconds, 3), 'cold_start': cold_start, 'scenarios': results}
+
+
+def main_config():
+    config = configparser.ConfigParser()
+    config.read(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.ini'))
+    return config['database'] if 'database' in config else {}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Times the app's searches, infobox queries, sub-searches and table operations headless against "
+                    "a MySQL database seeded with synthetic data, and reports the results as JSON.")
+    parser.add_argument('--host', help="defaults to the [database] host in config.ini")
+    parser.add_argument('--port', type=int, help="defaults to the [database] port in config.ini")
+    parser.add_argument('--user', help="defaults to the [database] user in config.ini")
+    parser.add_argument('--password', help="defaults to the [database] password in config.ini")
+    parser.add_argument('--database', default='ez_search_benchmark',
+                        help="database created and filled for the benchmark (default: ez_search_benchmark)")
+    parser.add_argument('--rows', default='1000',
+                        help="comma-separated rows per table, one benchmark run each, e.g. 1000,100000,1000000")
+    parser.add_argument('--iterations', type=int, default=20, help="timed runs per scenario (default: 20)")
+    parser.add_argument('--warmup', type=int, default=2, help="untimed runs before the timed ones (default: 2)")
+    parser.add_argument('--seed', type=int, default=1, help="random seed of the synthetic data (default: 1)")
+    parser.add_argument('--reseed', action='store_true', help="refill the tables even if they hold this data set")
+    parser.add_argument('--only', help="comma-separated scenario names to run")
+    parser.add_argument('--output', help="write the JSON report to this file instead of stdout")
+    return parser.parse_args()
+
+
+def run_benchmarks():
+    args = parse_args()
+    database_config = main_config()
+    host = args.host or database_config.get('host', '')
+    if args.database == database_config.get('database') and host == database_config.get('host'):
+        sys.exit("Refusing to seed the database configured in config.ini; choose another --database")
+
+    connection_config = {
+        'host': host,
+        'user': args.user or database_config.get('user', ''),
+        'password': args.password if args.password is not None else database_config.get('password', ''),
+        'port': args.port or int(database_config.get('port', 3306)),
+    }
+    BenchmarkWindow.database_overrides = dict(connection_config, database=args.database)
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    main.app = app
+    report = {
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'pymysql': pymysql.__version__,
+        'iterations': args.iterations,
+        'warmup': args.warmup,
+        'seed': args.seed,
+        'runs': [],
+    }
+    with tempfile.TemporaryDirectory() as export_folder:
+        BenchmarkWindow.export_folder = export_folder
+        for scale in (int(rows) for rows in args.rows.split(",")):
+            report['runs'].append(run_scale(app, args, connection_config, scale))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as report_file:
+            report_file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    run_benchmarks()
@@ -1,45 +1,796 @@
+import time
+
+# Startup is timed from here, so the imports below (PyQt5, the database driver) count towards it
+STARTED_AT = time.perf_counter()
+
 import sys
 import os
+import argparse
+import importlib
+import importlib.util
+import re
 import csv
+import gzip
+import json
+import sqlite3
+import threading
 import pymysql
 import configparser
-from PyQt5.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QLineEdit, QTableWidget,
-                             QTableWidgetItem, QComboBox, QGridLayout, QFrame, QPushButton, QHeaderView, QInputDialog,
-                             QSizePolicy, QDateEdit, QDialog, QLabel, QDialogButtonBox, QMessageBox)
-from PyQt5.QtCore import pyqtSlot, Qt, QDate, QTimer
+from array import array
+from collections import OrderedDict, defaultdict, deque
+from contextlib import contextmanager, nullcontext
+from decimal import Decimal
+from itertools import islice
+from operator import itemgetter
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QLineEdit, QTableView,
+                             QAbstractItemView, QComboBox, QGridLayout, QFrame, QPushButton, QHeaderView, QInputDialog,
+                             QSizePolicy, QDateTimeEdit, QDialog, QLabel, QDialogButtonBox, QMessageBox, QCheckBox,
+                             QMenu, QProgressDialog, QDockWidget, QToolButton)
+from PyQt5.QtCore import (pyqtSlot, pyqtSignal, Qt, QDateTime, QTime, QTimer, QObject, QRunnable, QThreadPool,
+                          QAbstractTableModel, QAbstractProxyModel, QModelIndex)
 from PyQt5.QtGui import QIcon, QPalette, QColor
-from datetime import datetime
+from bisect import bisect_left, bisect_right
+from datetime import datetime, date, timedelta
+from pymysql.constants import FIELD_TYPE
+
+# Optional modules, imported on first use instead of at startup (pyarrow alone takes longer to import than the
+# rest of the app): Parquet/Arrow exports need pyarrow, zstd-compressed CSV needs zstandard and the mysqlclient
+# driver needs MySQLdb
+OPTIONAL_MODULES = {}
+
+
+def optional_module(name):
+    # The imported module, None when it is not installed
+    if name not in OPTIONAL_MODULES:
+        try:
+            OPTIONAL_MODULES[name] = importlib.import_module(name)
+        except ImportError:
+            OPTIONAL_MODULES[name] = None
+    return OPTIONAL_MODULES[name]
+
+
+def module_installed(name):
+    # Answered without importing the module
+    if name in OPTIONAL_MODULES:
+        return OPTIONAL_MODULES[name] is not None
+    return importlib.util.find_spec(name) is not None
+
+
+class ResultRows(list):
+    # Fetched rows plus the cursor description, so the column types travel with the data
+    def __init__(self, rows=(), description=None):
+        super().__init__(rows)
+        self.description = description
+
+
+DATE_FIELD_TYPES = {FIELD_TYPE.DATE, FIELD_TYPE.NEWDATE, FIELD_TYPE.DATETIME, FIELD_TYPE.TIMESTAMP}
+INTEGER_FIELD_TYPES = {FIELD_TYPE.TINY, FIELD_TYPE.SHORT, FIELD_TYPE.LONG, FIELD_TYPE.LONGLONG, FIELD_TYPE.INT24,
+                       FIELD_TYPE.YEAR}
+EPOCH = datetime(1970, 1, 1)
+MISSING_TIMESTAMP = float('-inf')
+FLAG_TEXT = {b'\x01': "Yes", 1: "Yes"}  # BIT(1) flags arrive as bytes, TINYINT(1) ones as ints; anything else is "No"
+
+
+def result_column_kind(declared, field_type):
+    # The cursor metadata overrides a declared kind: BIT columns are flags and DATE/DATETIME/TIMESTAMP ones dates,
+    # and a column declared as a flag only is one when it arrives as a BIT or TINYINT (MySQL's BOOLEAN)
+    if field_type == FIELD_TYPE.BIT or (declared == 'flag' and field_type == FIELD_TYPE.TINY):
+        return 'flag'
+    if field_type in DATE_FIELD_TYPES:
+        return 'datetime'
+    if declared in ('flag', 'datetime'):
+        return 'int' if field_type in INTEGER_FIELD_TYPES else 'text'
+    return declared
+
+
+class ResultSchema:
+    # The columns a query returns, declared once as (name, kind) or (name, kind, missing) where kind is 'flag',
+    # 'datetime', 'int' or 'text'. Flags are shown as Yes/No, and NULL as missing where one is given. Results that
+    # carry a cursor description are typed from it (see result_column_kind); the declared kinds cover rows computed
+    # in Python. The converters are built once per set of kinds and each one is applied to a whole column.
+    def __init__(self, columns):
+        self.names = [column[0] for column in columns]
+        self.kinds = [column[1] for column in columns]
+        self.missing = [column[2] if len(column) > 2 else None for column in columns]
+        self._converters = {}
+
+    def kinds_for(self, description=None):
+        if not description or len(description) != len(self.kinds):
+            return tuple(self.kinds)
+        return tuple(result_column_kind(kind, column[1]) for kind, column in zip(self.kinds, description))
+
+    def converters(self, description=None):
+        kinds = self.kinds_for(description)
+        converters = self._converters.get(kinds)
+        if converters is None:
+            converters = self._converters[kinds] = self.compile(kinds)
+        return converters
+
+    def compile(self, kinds):
+        # One function per column taking and returning a list of values; None where values are shown as they are
+        converters = []
+        for kind, missing in zip(kinds, self.missing):
+            if kind == 'flag':
+                converters.append(lambda values: [FLAG_TEXT.get(value, "No") for value in values])
+            elif missing is not None:
+                converters.append(lambda values, missing=missing: [missing if value is None else value
+                                                                   for value in values])
+            else:
+                converters.append(None)
+        return converters
+
+    def flag_columns(self, description=None):
+        return [name for name, kind in zip(self.names, self.kinds_for(description)) if kind == 'flag']
+
+    def column_kinds(self, description=None):
+        return ['datetime' if kind == 'datetime' else None for kind in self.kinds_for(description)]
+
+    def convert_columns(self, rows, description=None):
+        columns = []
+        converters = self.converters(description or getattr(rows, 'description', None))
+        for position, convert in enumerate(converters):
+            values = list(map(itemgetter(position), rows))
+            columns.append(convert(values) if convert else values)
+        return columns
+
+    def convert_rows(self, rows, description=None):
+        # Row by row, for exports
+        return list(map(list, zip(*self.convert_columns(rows, description))))
+
+
+def to_timestamp(value):
+    # Naive seconds since 1970 for date/datetime values and ISO strings; MISSING_TIMESTAMP for anything else
+    if isinstance(value, datetime):
+        return (value.replace(tzinfo=None) - EPOCH).total_seconds()
+    if isinstance(value, date):
+        return (datetime(value.year, value.month, value.day) - EPOCH).total_seconds()
+    if isinstance(value, str):
+        try:
+            return to_timestamp(datetime.fromisoformat(value.strip()))
+        except ValueError:
+            return MISSING_TIMESTAMP
+    return MISSING_TIMESTAMP
+
+
+def to_timestamps(values):
+    try:
+        return array('d', [(value - EPOCH).total_seconds() for value in values])
+    except TypeError:
+        # Not all plain naive datetimes (dates, NULLs, strings): take the slow path for this batch
+        return array('d', map(to_timestamp, values))
+
+
+def row_runs(rows):
+    # Sorted row numbers as [first, last] runs of consecutive rows
+    runs = []
+    for row in rows:
+        if runs and row == runs[-1][1] + 1:
+            runs[-1][1] = row
+        else:
+            runs.append([row, row])
+    return runs
+
+
+class ColumnIndex:
+    # Dictionary-encodes a column (distinct display text -> row numbers) and indexes the distinct texts by trigram,
+    # so a substring filter touches the matching values instead of every row
+    def __init__(self, values):
+        rows_by_text = defaultdict(list)
+        for row, value in enumerate(values):
+            rows_by_text[str(value)].append(row)
+        self._rows = [array('l', rows) for rows in rows_by_text.values()]
+        self._texts = TrigramIndex(rows_by_text)
 
+    def lookup(self, needle):
+        matched = set()
+        for position in self._texts.search(needle):
+            matched.update(self._rows[position])
+        return matched
+
+
+class ResultTableModel(QAbstractTableModel):
+    # Holds query results column by column and only turns a value into text when the view asks for it
+    INDEX_MIN_ROWS = 5000
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._headers = []
+        self._columns = []
+        self._row_count = 0
+        self._column_kinds = []
+        self._timestamps = {}  # date column -> array('d') of seconds since 1970, MISSING_TIMESTAMP for NULL
+        self._date_indexes = {}  # date column -> (sorted timestamps, matching rows)
+        self._column_indexes = {}
+        self._generation = 0
+        self._index_signals = None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            return str(self._columns[index.column()][index.row()])
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal and section < len(self._headers):
+            return self._headers[section]
+        return None
+
+    def headers(self):
+        return list(self._headers)
+
+    def column_values(self, column):
+        return self._columns[column]
+
+    def row_values(self, row):
+        return [column[row] for column in self._columns]
+
+    def set_column_kinds(self, kinds):
+        # Date columns get a typed timestamp array next to the display values
+        kinds = list(kinds or [])
+        kinds += [None] * (len(self._headers) - len(kinds))
+        if kinds == self._column_kinds:
+            return
+        self._column_kinds = kinds
+        self._timestamps = {column: to_timestamps(self._columns[column])
+                            for column, kind in enumerate(kinds) if kind == 'datetime'}
+        self._date_indexes = {}
+
+    def is_date_column(self, column):
+        return column in self._timestamps
+
+    def timestamps(self, column):
+        return self._timestamps.get(column)
+
+    def rows_in_range(self, column, start, end):
+        # Binary search over the column's sorted timestamps; either bound may be None (open-ended)
+        index = self._date_indexes.get(column)
+        if index is None:
+            timestamps = self._timestamps[column]
+            rows = sorted((row for row in range(self._row_count) if timestamps[row] != MISSING_TIMESTAMP),
+                          key=timestamps.__getitem__)
+            index = self._date_indexes[column] = (array('d', map(timestamps.__getitem__, rows)), array('l', rows))
+        sorted_timestamps, rows = index
+        first = 0 if start is None else bisect_left(sorted_timestamps, start)
+        last = len(rows) if end is None else bisect_right(sorted_timestamps, end)
+        return set(rows[first:last])
+
+    def column_index(self, column):
+        # None until build_column_indexes has finished for the current rows
+        return self._column_indexes.get(column)
+
+    def build_column_indexes(self):
+        # Indexes every column on a pool thread from a snapshot; any change to the rows in the meantime
+        # bumps the generation and the stale result is dropped
+        if self._row_count < self.INDEX_MIN_ROWS or self._column_indexes:
+            return
+        generation = self._generation
+        snapshot = [list(values) for values in self._columns]
+        worker = QueryWorker(lambda: [ColumnIndex(values) for values in snapshot])
+        worker.signals.result.connect(lambda indexes: self._store_column_indexes(generation, indexes))
+        self._index_signals = worker.signals
+        QThreadPool.globalInstance().start(worker)
+
+    def _store_column_indexes(self, generation, indexes):
+        if generation == self._generation:
+            self._column_indexes = dict(enumerate(indexes))
+
+    def set_headers(self, headers):
+        self.beginResetModel()
+        self._headers = list(headers)
+        self._columns = [[] for _ in self._headers]
+        self._row_count = 0
+        self._column_kinds = []
+        self._timestamps = {}
+        self._invalidate_indexes()
+        self.set_column_kinds(None)
+        self.endResetModel()
+
+    def set_rows(self, rows, kinds=None):
+        self.set_column_data(self._transpose(rows), kinds)
+
+    def set_column_data(self, columns, kinds=None):
+        # Replaces the rows with results that are already split into columns
+        self.beginResetModel()
+        self._columns = [[] for _ in self._headers]
+        self._row_count = 0
+        self._column_kinds = []
+        self._timestamps = {}
+        self._invalidate_indexes()
+        if columns and len(columns[0]):
+            self._extend_columns(columns)
+        self.set_column_kinds(kinds)
+        self.endResetModel()
+
+    def append_rows(self, rows):
+        self.append_columns(self._transpose(rows))
+
+    def append_columns(self, columns):
+        if not columns or not len(columns[0]):
+            return
+        first = self._row_count
+        self.beginInsertRows(QModelIndex(), first, first + len(columns[0]) - 1)
+        self._extend_columns(columns)
+        self._invalidate_indexes()
+        self.endInsertRows()
+
+    def remove_rows(self, rows):
+        # One contiguous run at a time, from the end so the numbers of the runs before it stay valid
+        for first, last in reversed(row_runs(sorted(set(rows)))):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            for values in self._columns:
+                del values[first:last + 1]
+            for timestamps in self._timestamps.values():
+                del timestamps[first:last + 1]
+            self._row_count -= last - first + 1
+            self._invalidate_indexes()
+            self.endRemoveRows()
+
+    def _invalidate_indexes(self):
+        self._generation += 1
+        self._column_indexes = {}
+        self._date_indexes = {}
+
+    def _transpose(self, rows):
+        width = len(self._headers)
+        rows = rows if isinstance(rows, (list, tuple)) else list(rows)
+        if set(map(len, rows)) - {width}:
+            # Short placeholder rows such as ("No data available",) leave the remaining cells empty
+            rows = [tuple(row[:width]) + ("",) * (width - len(row)) for row in rows]
+        return [list(map(itemgetter(index), rows)) for index in range(width)]
+
+    def _extend_columns(self, columns):
+        for index, values in enumerate(columns):
+            stored = self._columns[index]
+            if isinstance(stored, array):
+                try:
+                    stored.extend(array('q', values))
+                    continue
+                except (TypeError, OverflowError):
+                    stored = self._columns[index] = list(stored)
+            elif not stored:
+                stored = self._columns[index] = self._compact(values)
+                continue
+            stored.extend(values)
+        for column, timestamps in self._timestamps.items():
+            timestamps.extend(to_timestamps(columns[column]))
+        self._row_count += len(columns[0])
+
+    @staticmethod
+    def _compact(values):
+        # Integer columns (ids, counters) are stored unboxed, which is several times smaller than a list of ints
+        if values and type(values[0]) is int:
+            try:
+                return array('q', values)
+            except (TypeError, OverflowError):
+                pass
+        return values
+
+
+class ResultProxyModel(QAbstractProxyModel):
+    # Sorts and filters by keeping a list of source row numbers, so neither operation copies any cell data
+    filtersChanged = pyqtSignal()
 
-class CustomTableWidget(QTableWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
+        self._rows = []
+        self._source_to_proxy = None
+        self._text_filters = {}  # column -> lower-cased substring
+        self._date_ranges = {}  # column -> (start, end) in seconds since 1970, None for an open end
+        self._search_filter = None  # (column, lower-cased substring) narrowing a search result, see set_search_filter
+        self._sort_column = -1
+        self._sort_order = Qt.AscendingOrder
+
+    def setSourceModel(self, source_model):
+        self.beginResetModel()
+        super().setSourceModel(source_model)
+        source_model.modelReset.connect(self._source_reset)
+        source_model.rowsInserted.connect(self._source_rows_inserted)
+        source_model.rowsAboutToBeRemoved.connect(self._source_rows_about_to_be_removed)
+        source_model.rowsRemoved.connect(self._source_rows_removed)
+        self._rebuild_rows()
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.sourceModel().columnCount()
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or not (0 <= row < len(self._rows)) or not (0 <= column < self.columnCount()):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=QModelIndex()):
+        return QModelIndex()
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid():
+            return QModelIndex()
+        return self.sourceModel().index(self._rows[proxy_index.row()], proxy_index.column())
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QModelIndex()
+        if self._source_to_proxy is None:
+            self._source_to_proxy = {source_row: row for row, source_row in enumerate(self._rows)}
+        row = self._source_to_proxy.get(source_index.row())
+        return QModelIndex() if row is None else self.createIndex(row, source_index.column())
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            return str(self.sourceModel().column_values(index.column())[self._rows[index.row()]])
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal:
+            header = self.sourceModel().headerData(section, orientation, role)
+            if role == Qt.DisplayRole and header and self.is_filtered(section):
+                return f"{header} *"
+            return header
+        if role == Qt.DisplayRole:
+            return str(section + 1)
+        return None
+
+    def source_row(self, row):
+        return self._rows[row]
+
+    def source_rows(self):
+        return self._rows
+
+    def set_column_filter(self, column, text):
+        # Case-insensitive substring filter on one column; combines with the filters on other columns
+        self.set_column_filters({column: text})
+
+    def set_column_filters(self, filters):
+        # {column: text} for several columns at once. When every change only narrows an existing filter
+        # (the new text contains the old one), just the currently visible rows are re-checked.
+        changed = {}
+        narrowing = True
+        for column, text in filters.items():
+            text = text.lower() if text else None
+            previous = self._text_filters.get(column)
+            if text == previous:
+                continue
+            changed[column] = text
+            if not (previous and text and previous in text):
+                narrowing = False
+        if not changed:
+            return
+
+        for column, text in changed.items():
+            if text:
+                self._text_filters[column] = text
+            else:
+                self._text_filters.pop(column, None)
+
+        if narrowing:
+            matches = self._row_matcher(changed.items(), {})
+            self._relayout([row for row in self._rows if matches(row)])
+            self._filters_changed()
+        else:
+            self._refilter()
+
+    def set_search_filter(self, column, text):
+        # Narrows the rows like a column filter, but belongs to the search rather than the user: it is not shown
+        # in the header or the filter bar, and goes away with the rows it was applied to
+        text = text.lower() if text else None
+        previous = self._search_filter
+        self._search_filter = (column, text) if text else None
+        if self._search_filter == previous:
+            return
+        if previous and text and previous[0] == column and previous[1] in text:
+            matches = self._row_matcher([self._search_filter], {})
+            self._relayout([row for row in self._rows if matches(row)])
+        else:
+            self._refilter()
+
+    def set_date_range(self, column, start, end):
+        # Pass start=end=None to remove the column's date filter
+        if start is None and end is None:
+            self._date_ranges.pop(column, None)
+        else:
+            self._date_ranges[column] = (start, end)
+        self._refilter()
+
+    def clear_filters(self):
+        self._text_filters.clear()
+        self._date_ranges.clear()
+        self._refilter()
+
+    def is_filtered(self, column):
+        return column in self._text_filters or column in self._date_ranges
+
+    def date_range(self, column):
+        return self._date_ranges.get(column)
+
+    def column_filter_text(self, column):
+        return self._text_filters.get(column)
+
+    def text_filters(self):
+        return dict(self._text_filters)
+
+    def date_ranges(self):
+        return dict(self._date_ranges)
+
+    def sort_key(self):
+        # (column, order) of the current sort, or None while the rows are in source order
+        if 0 <= self._sort_column < self.columnCount():
+            return self._sort_column, self._sort_order
+        return None
+
+    def _refilter(self):
+        # Indexed columns resolve to row sets that are intersected; everything else is evaluated in a single
+        # pass over the rows that survived the indexed filters
+        source_model = self.sourceModel()
+        matched = None
+        unindexed = []
+        for column, text in self._text_filter_items():
+            index = source_model.column_index(column)
+            if index is None:
+                unindexed.append((column, text))
+                continue
+            rows = index.lookup(text)
+            matched = rows if matched is None else matched & rows
+        for column, (start, end) in self._date_ranges.items():
+            rows = source_model.rows_in_range(column, start, end)
+            matched = rows if matched is None else matched & rows
+        rows = range(source_model.rowCount()) if matched is None else sorted(matched)
+
+        if unindexed:
+            matches = self._row_matcher(unindexed, {})
+            rows = [row for row in rows if matches(row)]
+        self._relayout(rows)
+        self._filters_changed()
+
+    def _text_filter_items(self):
+        items = list(self._text_filters.items())
+        if self._search_filter:
+            items.append(self._search_filter)
+        return items
+
+    def _row_matcher(self, text_filters, date_ranges):
+        # One function evaluating every given filter, so each row is visited once; text_filters are
+        # (column, text) pairs
+        source_model = self.sourceModel()
+        checks = [(source_model.column_values(column), text) for column, text in text_filters]
+        ranges = [(source_model.timestamps(column),
+                   MISSING_TIMESTAMP if start is None else start,
+                   float('inf') if end is None else end)
+                  for column, (start, end) in date_ranges.items()]
+
+        def matches(row):
+            for values, text in checks:
+                if text not in str(values[row]).lower():
+                    return False
+            for timestamps, start, end in ranges:
+                timestamp = timestamps[row]
+                if timestamp == MISSING_TIMESTAMP or not start <= timestamp <= end:
+                    return False
+            return True
+
+        return matches
+
+    def _filters_changed(self):
+        self.headerDataChanged.emit(Qt.Horizontal, 0, max(self.columnCount() - 1, 0))
+        self.filtersChanged.emit()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self._sort_column = column
+        self._sort_order = order
+        self._relayout(self._rows)
+
+    def _filtered(self, source_rows):
+        if not (self._text_filters or self._date_ranges or self._search_filter):
+            return list(source_rows)
+        matches = self._row_matcher(self._text_filter_items(), self._date_ranges)
+        return [row for row in source_rows if matches(row)]
+
+    def _sorted(self, rows):
+        if self._sort_column < 0 or self._sort_column >= self.columnCount():
+            return sorted(rows)
+        # Date columns sort on their timestamps, which also orders NULLs consistently
+        values = self.sourceModel().timestamps(self._sort_column)
+        if values is None:
+            values = self.sourceModel().column_values(self._sort_column)
+        reverse = self._sort_order == Qt.DescendingOrder
+        try:
+            return sorted(rows, key=values.__getitem__, reverse=reverse)
+        except TypeError:
+            # Mixed types (e.g. a placeholder text in a numeric column) fall back to comparing the shown text
+            return sorted(rows, key=lambda row: str(values[row]), reverse=reverse)
+
+    def _relayout(self, rows):
+        rows = self._sorted(rows)
+        self.layoutAboutToBeChanged.emit()
+        old_indexes = self.persistentIndexList()
+        old_source_rows = [self._rows[index.row()] for index in old_indexes]
+        self._rows = rows
+        self._source_to_proxy = None
+        new_indexes = []
+        for index, source_row in zip(old_indexes, old_source_rows):
+            mapped = self.mapFromSource(self.sourceModel().index(source_row, index.column()))
+            new_indexes.append(mapped)
+        self.changePersistentIndexList(old_indexes, new_indexes)
+        self.layoutChanged.emit()
+
+    def _rebuild_rows(self):
+        self._text_filters.clear()
+        self._date_ranges.clear()
+        self._search_filter = None
+        self._rows = self._sorted(range(self.sourceModel().rowCount()))
+        self._source_to_proxy = None
+
+    def _source_reset(self):
+        self.beginResetModel()
+        self._rebuild_rows()
+        self.endResetModel()
+        self.filtersChanged.emit()
+
+    def _source_rows_inserted(self, parent, first, last):
+        new_rows = self._filtered(range(first, last + 1))
+        if not new_rows:
+            return
+        if 0 <= self._sort_column < self.columnCount():
+            # Both runs are already ordered, so Timsort merges them in linear time
+            self._relayout(self._rows + self._sorted(new_rows))
+            return
+        start = len(self._rows)
+        self.beginInsertRows(QModelIndex(), start, start + len(new_rows) - 1)
+        self._rows.extend(new_rows)
+        self._source_to_proxy = None
+        self.endInsertRows()
+
+    def _source_rows_about_to_be_removed(self, parent, first, last):
+        # The rows showing them go first, while the source still has them; filters and sort order stay as they are
+        removed = [row for row, source_row in enumerate(self._rows) if first <= source_row <= last]
+        for start, end in reversed(row_runs(removed)):
+            self.beginRemoveRows(QModelIndex(), start, end)
+            del self._rows[start:end + 1]
+            self._source_to_proxy = None
+            self.endRemoveRows()
+
+    def _source_rows_removed(self, parent, first, last):
+        count = last - first + 1
+        self._rows = [source_row - count if source_row > last else source_row for source_row in self._rows]
+        self._source_to_proxy = None
+
+
+class CustomTableWidget(QTableView):
+    CLEAR_FILTER = 2  # dialog result next to QDialog.Accepted/Rejected
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.source_model = ResultTableModel(self)
+        self.proxy_model = ResultProxyModel(self)
+        self.proxy_model.setSourceModel(self.source_model)
+        self.setModel(self.proxy_model)
         self.setSortingEnabled(True)
+        self.source_query = None
+        self.suspended_sort = None
+
+        # Build the header filter indexes once the rows have stopped arriving
+        self.index_timer = QTimer(self)
+        self.index_timer.setSingleShot(True)
+        self.index_timer.setInterval(500)
+        self.index_timer.timeout.connect(self.source_model.build_column_indexes)
+        self.source_model.modelReset.connect(self.index_timer.start)
+        self.source_model.rowsInserted.connect(self.index_timer.start)
+        self.source_model.rowsRemoved.connect(self.index_timer.start)
+        # New contents end a streaming pause in the sort, e.g. when a stream is superseded by another search
+        self.source_model.modelReset.connect(self.resume_sorting)
+        self.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        # Size columns from a sample of rows so ResizeToContents stays cheap on very large results
+        self.horizontalHeader().setResizeContentsPrecision(100)
+        self.verticalHeader().setResizeContentsPrecision(100)
 
         # Enable context menu for right-click events
         self.horizontalHeader().setContextMenuPolicy(Qt.CustomContextMenu)
         self.horizontalHeader().customContextMenuRequested.connect(self.handle_header_context_menu)
 
+    def rowCount(self):
+        return self.proxy_model.rowCount()
+
+    def columnCount(self):
+        return self.source_model.columnCount()
+
+    def header_labels(self):
+        return self.source_model.headers()
+
+    def set_columns(self, columns):
+        if columns != self.source_model.headers():
+            self.source_model.set_headers(columns)
+
+    def set_results(self, columns, rows, column_kinds=None):
+        self.set_columns(columns)
+        self.source_model.set_rows(rows, column_kinds)
+
+    def set_column_kinds(self, column_kinds):
+        self.source_model.set_column_kinds(column_kinds)
+
+    def set_source_query(self, query, params=None, convert_rows=None, flag_columns=()):
+        # The query behind the current contents, so an export can re-run it instead of copying the loaded rows.
+        # flag_columns are shown as Yes/No instead of the stored bit, so they cannot be filtered in SQL.
+        if query is None:
+            self.source_query = None
+            return
+        self.source_query = {
+            'query': query.strip().rstrip(';'),
+            'params': tuple(params or ()),
+            'convert_rows': convert_rows,
+            'flag_columns': set(flag_columns),
+        }
+
+    def set_schema_results(self, schema, results):
+        # Shows query results converted as their schema and cursor description say
+        description = getattr(results, 'description', None)
+        self.set_columns(schema.names)
+        self.source_model.set_column_data(schema.convert_columns(results), schema.column_kinds(description))
+        self.update_flag_columns(schema, description)
+
+    def append_schema_results(self, schema, results):
+        description = getattr(results, 'description', None)
+        self.source_model.set_column_kinds(schema.column_kinds(description))
+        self.source_model.append_columns(schema.convert_columns(results))
+        self.update_flag_columns(schema, description)
+
+    def update_flag_columns(self, schema, description):
+        # Exports need the flags of the rows actually shown, which the description can correct
+        if description and self.source_query is not None:
+            self.source_query['flag_columns'] = set(schema.flag_columns(description))
+
+    def append_rows(self, rows):
+        self.source_model.append_rows(rows)
+
+    def append_columns(self, columns):
+        self.source_model.append_columns(columns)
+
+    def remove_rows(self, rows):
+        # Source row numbers, as row_values and visible_rows see them
+        self.source_model.remove_rows(rows)
+
+    def clear_rows(self):
+        self.source_model.set_rows([])
+
+    def show_message(self, message):
+        # Replaces the contents with a single informational row, keeping the current headers
+        if not self.source_model.headers():
+            self.source_model.set_headers([""])
+        self.source_model.set_rows([(message,)])
+
+    def row_values(self, row):
+        return self.source_model.row_values(self.proxy_model.source_row(row))
+
+    def selected_row_values(self):
+        selected_rows = self.selectionModel().selectedRows()
+        if not selected_rows:
+            return None
+        return self.row_values(selected_rows[0].row())
+
+    def visible_rows(self):
+        source_model = self.source_model
+        for source_row in self.proxy_model.source_rows():
+            yield source_model.row_values(source_row)
+
     def handle_header_context_menu(self, pos):
         logical_index = self.horizontalHeader().logicalIndexAt(pos)
-        self.filter_column(logical_index)
+        if logical_index >= 0:
+            self.filter_column(logical_index)
 
     def filter_column(self, column):
-        column_name = self.horizontalHeaderItem(column).text()
-        if column_name in ["Col1", "Col2", "Col3"]:
+        column_name = self.source_model.headers()[column]
+        if self.source_model.is_date_column(column):
             self.filter_by_date(column, column_name)
         else:
-            filter_value, ok = QInputDialog.getText(self, "Filter", f"Enter filter value for {column_name}:")
+            filter_value, ok = QInputDialog.getText(self, "Filter",
+                                                    f"Enter filter value for {column_name} (empty to clear):")
             if ok:
-                for row in range(self.rowCount()):
-                    item = self.item(row, column)
-                    if filter_value:
-                        if filter_value.lower() not in item.text().lower():
-                            self.setRowHidden(row, True)
-                        else:
-                            self.setRowHidden(row, False)
-                    else:
-                        self.setRowHidden(row, False)
+                self.proxy_model.set_column_filter(column, filter_value)
 
     def filter_by_date(self, column, column_name):
         dialog = QDialog(self)
@@ -49,47 +800,75 @@ class CustomTableWidget(QTableWidget):
         label = QLabel(f"Select a date range for {column_name}:")
         dialog_layout.addWidget(label)
 
-        date_edit_from = QDateEdit(dialog)
+        current_range = self.proxy_model.date_range(column) or (None, None)
+        now = QDateTime.currentDateTime()
+
+        # Each bound can be switched off for an open-ended range
+        date_edit_from = QDateTimeEdit(dialog)
         date_edit_from.setCalendarPopup(True)
-        date_edit_from.setDate(QDate.currentDate().addMonths(-1))  # default to last month
-        date_edit_from.setDisplayFormat("yyyy-MM-dd")
-        dialog_layout.addWidget(QLabel("From:"))
+        date_edit_from.setDisplayFormat("yyyy-MM-dd HH:mm:ss")
+        date_edit_from.setDateTime(self.to_qdatetime(current_range[0]) or now.addMonths(-1))  # default to last month
+        from_enabled = QCheckBox("From:", dialog)
+        from_enabled.setChecked(current_range[0] is not None or current_range == (None, None))
+        from_enabled.toggled.connect(date_edit_from.setEnabled)
+        date_edit_from.setEnabled(from_enabled.isChecked())
+        dialog_layout.addWidget(from_enabled)
         dialog_layout.addWidget(date_edit_from)
 
-        date_edit_to = QDateEdit(dialog)
+        date_edit_to = QDateTimeEdit(dialog)
         date_edit_to.setCalendarPopup(True)
-        date_edit_to.setDate(QDate.currentDate())
-        date_edit_to.setDisplayFormat("yyyy-MM-dd")
-        dialog_layout.addWidget(QLabel("To:"))
+        date_edit_to.setDisplayFormat("yyyy-MM-dd HH:mm:ss")
+        date_edit_to.setDateTime(self.to_qdatetime(current_range[1]) or QDateTime(now.date(), QTime(23, 59, 59)))
+        to_enabled = QCheckBox("To:", dialog)
+        to_enabled.setChecked(current_range[1] is not None or current_range == (None, None))
+        to_enabled.toggled.connect(date_edit_to.setEnabled)
+        date_edit_to.setEnabled(to_enabled.isChecked())
+        dialog_layout.addWidget(to_enabled)
         dialog_layout.addWidget(date_edit_to)
 
-        button_box = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        button_box = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel | QDialogButtonBox.Reset)
         button_box.accepted.connect(dialog.accept)
         button_box.rejected.connect(dialog.reject)
+        button_box.button(QDialogButtonBox.Reset).setText("Clear")
+        button_box.button(QDialogButtonBox.Reset).clicked.connect(lambda: dialog.done(self.CLEAR_FILTER))
         dialog_layout.addWidget(button_box)
 
         dialog.setLayout(dialog_layout)
 
-        if dialog.exec_() == QDialog.Accepted:
-            filter_date_from = date_edit_from.date()
-            filter_date_to = date_edit_to.date()
-
-            for row in range(self.rowCount()):
-                item = self.item(row, column)
-                if item:
-                    date_text = item.text().split()[0]  # Consider only the date part
-                    try:
-                        date_value = QDate.fromString(date_text, "yyyy-MM-dd")
-                        if filter_date_from <= date_value <= filter_date_to:
-                            self.setRowHidden(row, False)
-                        else:
-                            self.setRowHidden(row, True)
-                    except Exception as e:
-                        print(f"Invalid date format in row {row}: {item.text()}")
+        result = dialog.exec_()
+        if result == self.CLEAR_FILTER:
+            self.proxy_model.set_date_range(column, None, None)
+        elif result == QDialog.Accepted:
+            start = to_timestamp(date_edit_from.dateTime().toPyDateTime()) if from_enabled.isChecked() else None
+            end = to_timestamp(date_edit_to.dateTime().toPyDateTime()) if to_enabled.isChecked() else None
+            self.proxy_model.set_date_range(column, start, end)
+
+    @staticmethod
+    def to_qdatetime(timestamp):
+        if timestamp is None:
+            return None
+        return QDateTime(EPOCH + timedelta(seconds=timestamp))
+
+    def suspend_sorting(self):
+        # While rows stream in, merging every batch into a sorted view re-sorts all rows on the GUI thread; they are
+        # appended in arrival order instead and sorted once by resume_sorting
+        header = self.horizontalHeader()
+        if self.suspended_sort is None and header.sortIndicatorSection() >= 0:
+            self.suspended_sort = (header.sortIndicatorSection(), header.sortIndicatorOrder())
+            header.setSortIndicator(-1, Qt.AscendingOrder)
+
+    def resume_sorting(self):
+        if self.suspended_sort is None:
+            return
+        column, order = self.suspended_sort
+        self.suspended_sort = None
+        # A sort picked by the user while the rows were arriving stays
+        if self.horizontalHeader().sortIndicatorSection() < 0:
+            self.horizontalHeader().setSortIndicator(column, order)
 
     def sort_column(self, column):
         sort_order = self.horizontalHeader().sortIndicatorOrder()
-        self.sortItems(column, sort_order)
+        self.sortByColumn(column, sort_order)
         if sort_order == Qt.AscendingOrder:
             self.horizontalHeader().setSortIndicator(column, Qt.DescendingOrder)
         else:
@@ -110,9 +889,898 @@ class LoadingDialog(QDialog):
         self.adjustSize()  # Adjust the dialog size based on the content
 
 
-class MainWindow(QMainWindow):
+class DatabaseDriver:
+    # The client library every connection is opened with: pymysql, or mysqlclient, whose C row decoding fetches
+    # large results several times faster. Both speak the same DB-API dialect, so the rest of the app only needs
+    # the library's connect(), error classes and cursor classes from here.
+    NAMES = ('pymysql', 'mysqlclient')
+
+    def __init__(self, name='pymysql'):
+        if name == 'auto':
+            name = 'mysqlclient' if module_installed('MySQLdb') else 'pymysql'
+        if name == 'mysqlclient' and optional_module('MySQLdb') is None:
+            print("mysqlclient is not installed, using pymysql")
+            name = 'pymysql'
+        if name not in self.NAMES:
+            raise ValueError(f"Unknown database driver '{name}', expected one of: auto, {', '.join(self.NAMES)}")
+        self.name = name
+        if name == 'mysqlclient':
+            importlib.import_module('MySQLdb.cursors')
+        self.module = optional_module('MySQLdb') if name == 'mysqlclient' else pymysql
+        self.version = self.module.__version__
+        self.Error = self.module.MySQLError
+        self.OperationalError = self.module.OperationalError
+        self.ProgrammingError = self.module.ProgrammingError
+        self.cursor_classes = {'buffered': self.module.cursors.Cursor, 'unbuffered': self.module.cursors.SSCursor}
+        self.streaming_cursor = self.module.cursors.SSCursor
+        # pymysql has no protocol compression
+        self.supports_compress = name == 'mysqlclient'
+
+    @classmethod
+    def available(cls):
+        return [name for name in cls.NAMES if name == 'pymysql' or module_installed('MySQLdb')]
+
+    def options(self, settings):
+        # connect() arguments for the wire-level settings of the [connection] section
+        cursor = settings.get('cursor', 'buffered').strip().lower()
+        if cursor not in self.cursor_classes:
+            raise ValueError(f"Unknown cursor type '{cursor}', expected buffered or unbuffered")
+        options = {
+            'charset': settings.get('charset', 'utf8mb4').strip(),
+            'connect_timeout': int(settings.get('connect_timeout', 10)),
+            'cursorclass': self.cursor_classes[cursor],
+        }
+        for name in ('read_timeout', 'write_timeout'):
+            value = settings.get(name, '').strip()
+            if value and int(value):
+                options[name] = int(value)
+        if config_flag(settings, 'compress'):
+            if self.supports_compress:
+                options['compress'] = True
+            else:
+                print(f"{self.name} does not support protocol compression, connecting without it")
+        return options
+
+    def connect(self, **config):
+        return self.module.connect(**config)
+
+    def ping(self, connection):
+        # Raises the driver's Error for a dropped connection and the caller opens a new one; reconnecting in place
+        # would hide the new socket from the pool's recycle bookkeeping
+        if self.name == 'pymysql':
+            connection.ping(reconnect=False)
+        else:
+            connection.ping()
+
+
+def read_config():
+    config = configparser.ConfigParser()
+    if hasattr(sys, '_MEIPASS'):
+        config_path = os.path.join(sys._MEIPASS, 'config.ini')
+    else:
+        config_path = os.path.join(os.path.dirname(__file__), 'config.ini')
+
+    config.read(config_path)
+    return config
+
+
+def config_flag(section, key, default=False):
+    # Sections may be a plain dict when missing from config.ini, so parse the flag by hand
+    value = section.get(key)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def database_connection(config):
+    # The driver and connect() arguments of the configured server
+    # some of the DBs not use database as parameter to connect
+    if 'database' not in config:
+        raise KeyError("Config file is missing the 'database' section")
+
+    connection_settings = config['connection'] if 'connection' in config else {}
+    driver = DatabaseDriver(connection_settings.get('driver', 'pymysql').strip().lower())
+    connection_config = {
+        'host': config['database'].get('host', ''),
+        'user': config['database'].get('user', ''),
+        'password': config['database'].get('password', ''),
+        'database': config['database'].get('database', ''),
+        'port': int(config['database'].get('port', 3306))
+    }
+    connection_config.update(driver.options(connection_settings))
+    return driver, connection_config
+
+
+class ConnectionPool:
+    # Error codes that mean the connection itself is gone rather than the statement being wrong
+    LOST_CONNECTION_ERRORS = (2006, 2013, 2055)
+
+    def __init__(self, connection_config, min_size=1, max_size=5, idle_timeout=300, recycle=3600, metrics=None,
+                 driver=None):
+        self.connection_config = connection_config
+        self.driver = driver or DatabaseDriver()
+        self.min_size = min_size
+        self.max_size = max(max_size, 1)
+        self.idle_timeout = idle_timeout
+        self.recycle = recycle
+        self.metrics = metrics  # QueryMetrics the checkout time is reported to as connect time
+
+        self._condition = threading.Condition()
+        self._idle = []  # (connection, returned_at), most recently used last
+        self._created = {}
+        self._size = 0
+        self._local = threading.local()
+
+    def _open(self):
+        connection = self.driver.connect(**self.connection_config)
+        self._created[id(connection)] = time.monotonic()
+        return connection
+
+    def _discard(self, connection):
+        self._created.pop(id(connection), None)
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _prune_idle(self):
+        # Called with the lock held; keeps at least min_size connections around
+        now = time.monotonic()
+        while len(self._idle) > self.min_size and now - self._idle[0][1] > self.idle_timeout:
+            connection, _ = self._idle.pop(0)
+            self._size -= 1
+            self._discard(connection)
+
+    def acquire(self):
+        with self._condition:
+            while True:
+                self._prune_idle()
+                if self._idle:
+                    connection, _ = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    connection = None
+                    break
+                self._condition.wait()
+
+        try:
+            if connection is None:
+                return self._open()
+            if time.monotonic() - self._created.get(id(connection), 0) > self.recycle:
+                self._discard(connection)
+                return self._open()
+            # Liveness check before handing the connection out; a dropped one is replaced by a new connection
+            try:
+                self.driver.ping(connection)
+            except self.driver.Error:
+                self._discard(connection)
+                return self._open()
+            return connection
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+    def release(self, connection, discard=False):
+        with self._condition:
+            if discard:
+                self._size -= 1
+                self._discard(connection)
+            else:
+                self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    @contextmanager
+    def tracking(self, request):
+        # Connections checked out by this thread inside the block are attached to request while they are in use
+        self._local.request = request
+        try:
+            yield
+        finally:
+            self._local.request = None
+
+    @contextmanager
+    def connection(self):
+        with self.metrics.timed('connect') if self.metrics is not None else nullcontext():
+            connection = self.acquire()
+        request = getattr(self._local, 'request', None)
+        try:
+            if request is not None:
+                request.attach(connection)
+            try:
+                yield connection
+            finally:
+                if request is not None:
+                    request.detach(connection)
+        except self.driver.OperationalError:
+            self.release(connection, discard=True)
+            raise
+        except Exception:
+            try:
+                connection.rollback()
+            except Exception:
+                self.release(connection, discard=True)
+                raise
+            self.release(connection)
+            raise
+        else:
+            self.release(connection)
+
+    def run(self, fn):
+        # Runs fn(connection), retrying once on a fresh connection if the server dropped the old one
+        try:
+            with self.connection() as connection:
+                return fn(connection)
+        except self.driver.OperationalError as e:
+            # A read timeout is reported as a lost connection too, but retrying would only run into it again
+            if not e.args or e.args[0] not in self.LOST_CONNECTION_ERRORS or isinstance(e.__context__, TimeoutError):
+                raise
+        with self.connection() as connection:
+            return fn(connection)
+
+    def prewarm(self, count):
+        # Opens connections until count are idle, one at a time so each can serve a query as soon as it is ready;
+        # returns how many were opened
+        with self._condition:
+            needed = min(count - len(self._idle), self.max_size - self._size)
+            self._size += max(needed, 0)
+        opened = 0
+        try:
+            for _ in range(max(needed, 0)):
+                with self.metrics.timed('connect') if self.metrics is not None else nullcontext():
+                    connection = self._open()
+                self.release(connection)
+                opened += 1
+        finally:
+            if opened < needed:
+                with self._condition:
+                    self._size -= needed - opened
+                    self._condition.notify_all()
+        return opened
+
+    def close_all(self):
+        with self._condition:
+            while self._idle:
+                connection, _ = self._idle.pop()
+                self._size -= 1
+                self._discard(connection)
+
+
+class QueryCancelled(Exception):
+    # Raised instead of starting work for a request that has been superseded
+    pass
+
+
+class QueryRequest:
+    # The in-flight work of one panel (or export). The pool records the server thread of every connection used
+    # for it, so a superseded request can have its running statements killed on the server.
     def __init__(self):
+        self.cancelled = False
+        self._thread_ids = set()
+        self._lock = threading.Lock()
+
+    def attach(self, connection):
+        # A kill only reaches statements that are already running, so a request cancelled while its worker was
+        # queued or checking out a connection must not start one
+        with self._lock:
+            if self.cancelled:
+                raise QueryCancelled()
+            self._thread_ids.add(connection.thread_id())
+
+    def detach(self, connection):
+        # Waits for a kill in progress, so a connection cannot go back to the pool and be killed there
+        with self._lock:
+            self._thread_ids.discard(connection.thread_id())
+
+    def kill(self, kill_query):
+        with self._lock:
+            for thread_id in list(self._thread_ids):
+                kill_query(thread_id)
+
+
+class TrigramIndex:
+    # Maps every 3-character substring of the lower-cased texts to the positions of the texts containing it,
+    # so a substring query only has to verify the rows that share all of its trigrams
+    def __init__(self, texts):
+        self._texts = [str(text).lower() if text is not None else "" for text in texts]
+        postings = defaultdict(list)
+        for position, text in enumerate(self._texts):
+            for gram in {text[i:i + 3] for i in range(len(text) - 2)}:
+                postings[gram].append(position)
+        self._postings = {gram: array('l', positions) for gram, positions in postings.items()}
+
+    def __len__(self):
+        return len(self._texts)
+
+    def search(self, needle):
+        # Returns the sorted positions of the texts containing needle (case-insensitive)
+        needle = needle.lower()
+        texts = self._texts
+        if len(needle) < 3:
+            return [position for position, text in enumerate(texts) if needle in text]
+
+        postings = []
+        for gram in {needle[i:i + 3] for i in range(len(needle) - 2)}:
+            positions = self._postings.get(gram)
+            if positions is None:
+                return []
+            postings.append(positions)
+        postings.sort(key=len)
+
+        candidates = set(postings[0])
+        for positions in postings[1:]:
+            candidates.intersection_update(positions)
+            if not candidates:
+                return []
+        if len(needle) == 3:
+            return sorted(candidates)
+        return sorted(position for position in candidates if needle in texts[position])
+
+
+class DescriptionIndex:
+    # Local copy of a package table with a trigram index over its description column (Col4)
+    def __init__(self, rows):
+        self.rows = rows
+        self.description = getattr(rows, 'description', None)
+        self.built_at = datetime.now()
+        self._index = TrigramIndex(row[3] for row in rows)
+
+    def search(self, search_text):
+        rows = self.rows
+        return ResultRows((rows[position] for position in self._index.search(search_text)), self.description)
+
+    def count(self, search_text):
+        return len(self._index.search(search_text))
+
+    def page(self, search_text, after, limit):
+        # Same paging as the database: matches in (Col3, Col1) order, starting after the key `after`
+        matches = sorted(self.search(search_text), key=itemgetter(2, 0))
+        start = 0 if after is None else bisect_right([(row[2], row[0]) for row in matches], after)
+        return ResultRows(matches[start:start + limit], self.description)
+
+
+class QueryCache:
+    # Bounded in-memory result cache: entries expire after their own TTL and the least recently used
+    # ones are evicted once the approximate size goes over max_bytes
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[2]
+
+    def contains(self, key):
+        # Lookup that neither counts as a hit or miss nor refreshes the entry's LRU position
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] >= time.monotonic()
+
+    def put(self, key, value, ttl):
+        if ttl <= 0:
+            return
+        size = self.estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, size, value)
+            self._size += size
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def discard(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def size_bytes(self):
+        return self._size
+
+    def _remove(self, key):
+        self._size -= self._entries.pop(key)[1]
+
+    @staticmethod
+    def estimate_size(rows, sample_size=100):
+        # Extrapolates from the first rows; exact accounting would cost as much as the query itself
+        if not rows:
+            return sys.getsizeof(rows)
+        sample = rows[:sample_size]
+        sample_bytes = sum(sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row) for row in sample)
+        return sys.getsizeof(rows) + sample_bytes * len(rows) // len(sample)
+
+
+class ReferenceReplica:
+    # On-disk SQLite copy of slow-changing reference tables. A sync first reads the table's change marker on the
+    # server and only transfers rows when it moved: the rows changed since the last sync when the table has an
+    # updated-at column, otherwise the whole table. Every thread opens its own SQLite connection.
+    BATCH_SIZE = 5000
+
+    def __init__(self, path, tables, driver=None):
+        self.path = path
+        self.tables = tables  # table -> {'key': primary key column, 'updated': last-modified column or None}
+        self.driver = driver or DatabaseDriver()
+        self.synced = {}  # table -> time of the last successful sync
+        self._descriptions = {}
+        self._sync_lock = threading.Lock()
+        with self._database() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE IF NOT EXISTS replica_state "
+                       "(name TEXT PRIMARY KEY, description TEXT, marker TEXT, synced_at TEXT)")
+            for name, description, _, synced_at in db.execute("SELECT * FROM replica_state"):
+                # A copy whose sync never completed is read from the server until the next sync finishes it
+                if name in tables and description is not None and synced_at is not None:
+                    self._descriptions[name] = [tuple(column) for column in json.loads(description)]
+                    self.synced[name] = datetime.fromisoformat(synced_at)
+
+    @contextmanager
+    def _database(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    @staticmethod
+    def _stored(value):
+        # SQLite keeps numbers, text and bytes; dates and decimals are stored as their ISO/str text
+        if value is None or isinstance(value, (int, float, str, bytes)):
+            return value
+        if isinstance(value, (datetime, date)):
+            return value.isoformat(sep=' ') if isinstance(value, datetime) else value.isoformat()
+        return str(value)
+
+    def read(self, table, query):
+        # Runs one of the app's plain SELECTs on the copy of table; the rows come back with the server's column
+        # metadata, so they are typed like rows fetched from MySQL
+        with self._database() as db:
+            cursor = db.execute(query)
+            names = [column[0] for column in cursor.description]
+            rows = cursor.fetchall()
+        described = {column[0]: column for column in self._descriptions[table]}
+        description = [described.get(name, (name, None, None, None, None, None, True)) for name in names]
+
+        date_columns = [position for position, column in enumerate(description) if column[1] in DATE_FIELD_TYPES]
+        if date_columns:
+            rows = [list(row) for row in rows]
+            for row in rows:
+                for position in date_columns:
+                    if row[position] is not None:
+                        value = datetime.fromisoformat(row[position])
+                        row[position] = value.date() if description[position][1] == FIELD_TYPE.DATE else value
+        return ResultRows(rows, description)
+
+    def sync(self, table, connection, force=False):
+        # Runs on a worker thread with a pooled MySQL connection; returns the number of rows transferred
+        with self._sync_lock:
+            settings = self.tables[table]
+            with self._database() as db:
+                state = db.execute("SELECT marker FROM replica_state WHERE name = ?", (table,)).fetchone()
+            # No marker counts for a copy whose sync never completed, so it is copied again in full
+            previous_marker = json.loads(state[0]) if state and state[0] and table in self._descriptions else None
+
+            with connection.cursor() as cursor:
+                marker = self.server_marker(cursor, table, settings)
+            connection.commit()
+
+            # The marker and sync time are written in the same transaction as the rows they describe
+            synced_at = datetime.now()
+            if marker == previous_marker and not force:
+                transferred = 0
+                with self._database() as db:
+                    self._save_state(db, table, marker, synced_at)
+            elif settings['updated'] and previous_marker is not None and not force:
+                transferred = self.copy_changed_rows(table, connection, settings, previous_marker[1], marker,
+                                                     synced_at)
+            else:
+                transferred = self.copy_table(table, connection, settings, marker, synced_at)
+            self.synced[table] = synced_at
+            return transferred
+
+    def _save_state(self, db, table, marker, synced_at):
+        db.execute("INSERT OR REPLACE INTO replica_state (name, description, marker, synced_at) VALUES (?, ?, ?, ?)",
+                   (table, json.dumps(self._descriptions[table]), json.dumps(marker), synced_at.isoformat(sep=' ')))
+
+    @staticmethod
+    def server_marker(cursor, table, settings):
+        # The count and newest last-modified time, or MySQL's table checksum; falls back to the count and the
+        # highest key where the engine has no checksum
+        if not settings['updated']:
+            cursor.execute(f"CHECKSUM TABLE {table}")
+            checksum = cursor.fetchone()[1]
+            if checksum is not None:
+                return [checksum]
+        cursor.execute(f"SELECT COUNT(*), MAX({settings['updated'] or settings['key']}) FROM {table}")
+        return [ReferenceReplica._stored(value) for value in cursor.fetchone()]
+
+    def copy_changed_rows(self, table, connection, settings, since, marker, synced_at):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT * FROM {table} WHERE {settings['updated']} >= %s", (since,))
+            rows = cursor.fetchall()
+        connection.commit()
+        with self._database() as db:
+            placeholders = ", ".join(["?"] * len(self._descriptions[table]))
+            db.executemany(f'INSERT OR REPLACE INTO "{table}" VALUES ({placeholders})',
+                           ([self._stored(value) for value in row] for row in rows))
+            local_count = db.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+            if local_count != marker[0]:
+                # Rows were deleted on the server, which no last-modified column shows; the copy below replaces
+                # these rows, and the marker is only saved with it
+                db.rollback()
+            else:
+                self._save_state(db, table, marker, synced_at)
+        if local_count != marker[0]:
+            return len(rows) + self.copy_table(table, connection, settings, marker, synced_at)
+        return len(rows)
+
+    def copy_table(self, table, connection, settings, marker, synced_at):
+        # Streams the whole table into a new SQLite table that replaces the old one in a single transaction, so
+        # reads never see a half-copied table
+        transferred = 0
+        staging = f"{table}__sync"
+        with connection.cursor(self.driver.streaming_cursor) as cursor, self._database() as db:
+            cursor.execute(f"SELECT * FROM {table}")
+            description = [tuple(column) for column in cursor.description]
+            names = [column[0] for column in description]
+            columns = ", ".join(f'"{name}" PRIMARY KEY' if name == settings['key'] else f'"{name}"'
+                                for name in names)
+            db.execute(f'DROP TABLE IF EXISTS "{staging}"')
+            db.execute(f'CREATE TABLE "{staging}" ({columns})')
+            insert = f'INSERT OR REPLACE INTO "{staging}" VALUES ({", ".join(["?"] * len(names))})'
+            while True:
+                rows = cursor.fetchmany(self.BATCH_SIZE)
+                if not rows:
+                    break
+                db.executemany(insert, ([self._stored(value) for value in row] for row in rows))
+                transferred += len(rows)
+            db.execute(f'DROP TABLE IF EXISTS "{table}"')
+            db.execute(f'ALTER TABLE "{staging}" RENAME TO "{table}"')
+            self._descriptions[table] = description
+            self._save_state(db, table, marker, synced_at)
+        connection.commit()
+        return transferred
+
+
+class QueryStats:
+    # Where the time of one background query went: connect/execute/fetch are measured on the worker thread,
+    # render is the time the GUI thread spent displaying what the query returned
+    PHASES = ('connect', 'execute', 'fetch', 'render')
+
+    def __init__(self, label):
+        self.label = label
+        self.started_at = datetime.now()
+        self.timings = dict.fromkeys(self.PHASES, 0.0)
+        self.total = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.cached = False
+        self.prefetched = False  # answered by a prefetch that was already running; total is the wait for it
+        self.cancelled = False
+        self.error = None
+
+    def status(self):
+        if self.error is not None:
+            return "cancelled" if self.cancelled else "error"
+        if self.cached:
+            return "cache"
+        return "cancelled" if self.cancelled else "prefetch" if self.prefetched else "ok"
+
+    def summary(self):
+        milliseconds = {phase: seconds * 1000 for phase, seconds in self.timings.items()}
+        if self.error is not None:
+            return f"{self.label}: {self.status()} after {self.total * 1000:,.0f} ms"
+        if self.cached:
+            return f"{self.label}: {self.rows:,} rows from cache · render {milliseconds['render']:,.0f} ms"
+        if self.prefetched:
+            return (f"{self.label}: {self.rows:,} rows from prefetch · "
+                    f"waited {self.total * 1000 - milliseconds['render']:,.0f} ms · "
+                    f"render {milliseconds['render']:,.0f} ms")
+        return (f"{self.label}: {self.rows:,} rows · {self.bytes / 1024:,.0f} KB · "
+                + " · ".join(f"{phase} {value:,.0f} ms" for phase, value in milliseconds.items()))
+
+    def as_dict(self):
+        return {
+            'time': self.started_at.isoformat(timespec='milliseconds'),
+            'query': self.label,
+            **{f"{phase}_ms": round(seconds * 1000, 1) for phase, seconds in self.timings.items()},
+            'total_ms': round(self.total * 1000, 1),
+            'rows': self.rows,
+            'bytes': self.bytes,
+            'status': self.status(),
+            'error': self.error,
+        }
+
+
+class QueryMetrics:
+    # Collects QueryStats. While a query runs, the QueryStats it reports to is bound to its worker thread, so the
+    # pool and the fetch helpers can add their timings without it being passed down. Finished stats are kept for
+    # the timings panel and optionally appended to a JSON Lines log.
+    def __init__(self, log_path=None, history=500):
+        self.log_path = log_path
+        self.history = deque(maxlen=max(history, 1))
+        self.errors = 0
+        self._local = threading.local()
+
+    @contextmanager
+    def measuring(self, stats):
+        previous = getattr(self._local, 'stats', None)
+        self._local.stats = stats
+        started = time.perf_counter()
+        try:
+            yield stats
+        finally:
+            stats.total += time.perf_counter() - started
+            self._local.stats = previous
+
+    @contextmanager
+    def timed(self, phase):
+        stats = getattr(self._local, 'stats', None)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            if stats is not None:
+                stats.timings[phase] += time.perf_counter() - started
+
+    def count_rows(self, rows):
+        stats = getattr(self._local, 'stats', None)
+        if stats is not None and rows:
+            stats.rows += len(rows)
+            stats.bytes += QueryCache.estimate_size(rows)
+
+    @staticmethod
+    def rendering(stats, deliver):
+        # Wraps a GUI-thread callback so the time it takes counts as render time
+        if deliver is None:
+            return None
+
+        def timed_delivery(value):
+            started = time.perf_counter()
+            try:
+                deliver(value)
+            finally:
+                stats.timings['render'] += time.perf_counter() - started
+
+        return timed_delivery
+
+    def record(self, stats):
+        # GUI thread only
+        if stats.error is not None and not stats.cancelled:
+            self.errors += 1
+        self.history.append(stats)
+        if not self.log_path:
+            return
+        try:
+            with open(self.log_path, 'a', encoding='utf-8') as log_file:
+                log_file.write(json.dumps(stats.as_dict(), default=str) + "\n")
+        except OSError as e:
+            print(f"Could not write query log {self.log_path}: {e}")
+            self.log_path = None
+
+
+EXPORT_FORMATS = {
+    # format -> (menu label, file extension, required module)
+    'csv': ("CSV", ".csv", None),
+    'csv.gz': ("CSV (gzip)", ".csv.gz", None),
+    'csv.zst': ("CSV (zstd)", ".csv.zst", 'zstandard'),
+    'parquet': ("Parquet", ".parquet", 'pyarrow'),
+    'arrow': ("Arrow IPC", ".arrow", 'pyarrow'),
+}
+FLOAT_FIELD_TYPES = {FIELD_TYPE.FLOAT, FIELD_TYPE.DOUBLE, FIELD_TYPE.DECIMAL, FIELD_TYPE.NEWDECIMAL}
+
+
+def missing_export_module(export_format):
+    # Name of the module the format needs but which is not installed, None when the format can be written
+    module = EXPORT_FORMATS[export_format][2]
+    return module if module and not module_installed(module) else None
+
+
+def export_column_types(columns, flag_columns, description=None, kinds=(), column_values=None):
+    # 'bool', 'timestamp', 'int', 'float' or 'string' per column: from the cursor metadata for database exports,
+    # from the loaded values otherwise
+    types = []
+    for position, name in enumerate(columns):
+        if name in flag_columns:
+            types.append('bool')
+        elif description:
+            field_type = description[position][1]
+            types.append('bool' if field_type == FIELD_TYPE.BIT else
+                         'timestamp' if field_type in DATE_FIELD_TYPES else
+                         'int' if field_type in INTEGER_FIELD_TYPES else
+                         'float' if field_type in FLOAT_FIELD_TYPES else 'string')
+        elif position < len(kinds) and kinds[position] == 'datetime':
+            types.append('timestamp')
+        else:
+            types.append(infer_export_type(column_values(position)))
+    return types
+
+
+def infer_export_type(values):
+    if isinstance(values, array):
+        return 'int'
+    value_types = set(map(type, values)) - {type(None)}
+    if value_types and value_types <= {int}:
+        return 'int'
+    if value_types and value_types <= {int, float, Decimal}:
+        return 'float'
+    return 'string'
+
+
+def to_export_bool(value):
+    # Flags arrive as b'\x01'/b'\x00' (or 1/0) from the database and as Yes/No from the loaded rows
+    if value in (b'\x01', 1, "Yes"):
+        return True
+    if value in (b'\x00', 0, "No"):
+        return False
+    return None
+
+
+def to_export_timestamp(value):
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    return None
+
+
+def to_export_string(value):
+    if value is None:
+        return None
+    if isinstance(value, bytes):
+        return value.decode('utf-8', 'replace')
+    return str(value)
+
+
+EXPORT_CONVERTERS = {
+    'bool': to_export_bool,
+    'timestamp': to_export_timestamp,
+    'int': lambda value: value if isinstance(value, int) else None,
+    'float': lambda value: float(value) if isinstance(value, (int, float, Decimal)) else None,
+    'string': to_export_string,
+}
+
+
+@contextmanager
+def export_writer(file_path, export_format, columns, types):
+    # Yields write(display_rows, typed_rows), called once per batch. Text formats write the rows as they are shown;
+    # columnar formats write the typed values, with one Arrow type per column.
+    if export_format in ('parquet', 'arrow'):
+        pyarrow = optional_module('pyarrow')
+        importlib.import_module('pyarrow.parquet' if export_format == 'parquet' else 'pyarrow.ipc')
+        arrow_types = {'bool': pyarrow.bool_(), 'timestamp': pyarrow.timestamp('us'), 'int': pyarrow.int64(),
+                       'float': pyarrow.float64(), 'string': pyarrow.string()}
+        schema = pyarrow.schema([(name, arrow_types[kind]) for name, kind in zip(columns, types)])
+        converters = [EXPORT_CONVERTERS[kind] for kind in types]
+        sink = None
+        if export_format == 'parquet':
+            writer = pyarrow.parquet.ParquetWriter(file_path, schema)
+        else:
+            sink = pyarrow.OSFile(file_path, 'wb')
+            writer = pyarrow.ipc.new_file(sink, schema)
+
+        def write(display_rows, typed_rows):
+            if not typed_rows:
+                return
+            arrays = [pyarrow.array([convert(row[position]) for row in typed_rows], type=schema.field(position).type)
+                      for position, convert in enumerate(converters)]
+            writer.write_table(pyarrow.Table.from_arrays(arrays, schema=schema))
+
+        try:
+            yield write
+        finally:
+            writer.close()
+            if sink is not None:
+                sink.close()
+        return
+
+    if export_format == 'csv.gz':
+        file = gzip.open(file_path, 'wt', compresslevel=6, newline='', encoding='utf-8')
+    elif export_format == 'csv.zst':
+        file = optional_module('zstandard').open(file_path, 'wt', newline='', encoding='utf-8')
+    else:
+        file = open(file_path, mode='w', newline='', encoding='utf-8')
+    with file:
+        csv_writer = csv.writer(file)
+        csv_writer.writerow(columns)
+        yield lambda display_rows, typed_rows: csv_writer.writerows([str(value) for value in row]
+                                                                    for row in display_rows)
+
+
+class WorkerSignals(QObject):
+    result = pyqtSignal(object)
+    error = pyqtSignal(object)
+    progress = pyqtSignal(object)
+    finished = pyqtSignal()
+
+
+class QueryWorker(QRunnable):
+    # Runs a blocking database call on a pool thread and reports back to the GUI thread through signals
+    def __init__(self, fn, *args, **kwargs):
         super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            self.emit('error', e)
+        else:
+            self.emit('result', result)
+        finally:
+            self.emit('finished')
+
+    def emit(self, name, *args):
+        try:
+            getattr(self.signals, name).emit(*args)
+        except RuntimeError:
+            pass  # the signals were deleted with the application while the call was still running
+
+
+class MainWindow(QMainWindow):
+    STREAM_BATCH_SIZE = 5000
+    ER_FT_MATCHING_KEY_NOT_FOUND = 1191
+    ER_NO_SUCH_THREAD = 1094
+    FIXTURE_LOOKUP_CHUNK = 500
+    BATCH_LOOKUP_CHUNK = 500
+    MISSING_IDS_SHOWN = 50
+    ACTIVITY_DAYS = 14  # window of the recent activity options (Option3-5)
+    # Tables the panels query, whose metadata is read ahead of the first search
+    PANEL_TABLES = ("table1", "table2", "table3", "table4", "table5", "table6", "table7", "table8", "table9",
+                    "table10", "table11")
+    STARTUP_EVENTS = {'interactive': "ready", 'connected': "connected", 'warm': "warmed up",
+                      'first_result': "first result"}
+    TIMINGS_COLUMNS = ["Time", "Query", "Connect ms", "Execute ms", "Fetch ms", "Render ms", "Total ms", "Rows", "KB",
+                       "Status"]
+    # Columns of the main search queries (table5/table6)
+    MAIN_SCHEMA = ResultSchema([("Col1", 'int'), ("Col2", 'flag'), ("Col3", 'int'), ("Col4", 'text'),
+                                ("Col5", 'datetime'), ("Col6", 'flag'), ("Col7", 'flag')])
+    FIXTURES_SCHEMA = ResultSchema([("Col1", 'int'), ("Col2", 'text'), ("Col3", 'datetime')])
+    PROVIDER_SCHEMA = ResultSchema([("Col1", 'int'), ("Col2", 'flag'), ("Col3", 'flag'), ("Col4", 'flag')])
+    LANGUAGE_SCHEMA = ResultSchema([("Col1", 'int'), ("Col2", 'text'), ("Col3", 'text')])
+    NO_DATA = "No data available"
+    OPTION2_SCHEMA = ResultSchema([("Col1", 'int', NO_DATA), ("Col5", 'datetime', NO_DATA), ("Level", 'text', NO_DATA)])
+
+    def __init__(self, started_at=None):
+        super().__init__()
+        # Startup milestones are timed from started_at: when main.py started loading, for the app itself
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        self.startup_timings = {}
+
+        self.thread_pool = QThreadPool(self)
+        self.active_workers = set()
+        # KILL QUERY runs on its own thread and connection, so it never waits behind the queries it should stop
+        self.kill_pool = QThreadPool(self)
+        self.kill_pool.setMaxThreadCount(1)
+        self.kill_connection = None
+        self.panel_requests = {}  # panel -> QueryRequest currently allowed to deliver results
 
         self.setWindowTitle("Ez DB search")
         self.setGeometry(100, 100, 1024, 720)
@@ -135,10 +1803,15 @@ class MainWindow(QMainWindow):
         self.search_textbox.returnPressed.connect(self.search_textbox_keydown)
         left_layout.addWidget(self.search_textbox)
 
+        # Search-as-you-type: fires once typing pauses (enabled from load_database_config)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.timeout.connect(self.search_as_you_type)
+        self.main_search_base = None  # last completed server search, see can_refine_locally
+
         # Main result table
         self.result_table = CustomTableWidget()
-        self.result_table.setColumnCount(8)
-        self.result_table.setHorizontalHeaderLabels([
+        self.result_table.set_columns([
             "Col1", "Col2", "Col3", "Col4",
             "Col5", "Col6", "Col7", "Col8"
         ])
@@ -150,16 +1823,61 @@ class MainWindow(QMainWindow):
             else:
                 header.setSectionResizeMode(column, QHeaderView.ResizeToContents)
 
-        self.result_table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.result_table.setSelectionMode(QTableWidget.SingleSelection)
+        self.result_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.result_table.setSelectionMode(QAbstractItemView.SingleSelection)
         self.result_table.setMaximumWidth(525)
-        self.result_table.itemSelectionChanged.connect(self.result_table_selection_changed)
+        self.result_table.selectionModel().selectionChanged.connect(self.result_table_selection_changed)
+        self.result_table.setMouseTracking(True)
+        self.result_table.entered.connect(self.result_table_row_hovered)
+
+        # Infobox prefetch for the selected or hovered row (enabled from load_database_config)
+        self.prefetch_timer = QTimer(self)
+        self.prefetch_timer.setSingleShot(True)
+        self.prefetch_timer.timeout.connect(self.prefetch_infoboxes)
+        self.prefetch_package_id = None
+        self.prefetch_queue = deque()  # (cache_key, fn, args, cache_ttl) waiting for a free prefetch slot
+        self.prefetches = {}  # cache_key -> in-flight prefetch
+        self.prefetch_running = 0
+
+        # Filter bar: one box per result column, all non-empty boxes are combined
+        filter_bar = QWidget()
+        filter_bar.setMaximumWidth(525)
+        filter_bar_layout = QHBoxLayout()
+        filter_bar_layout.setContentsMargins(0, 0, 0, 0)
+        filter_bar_layout.setSpacing(2)
+        filter_bar.setLayout(filter_bar_layout)
+
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(150)
+        self.filter_timer.timeout.connect(self.filter_results)
+
+        self.result_filter_edits = []
+        for column_name in self.result_table.header_labels():
+            filter_edit = QLineEdit(self)
+            filter_edit.setPlaceholderText(column_name)
+            filter_edit.setClearButtonEnabled(True)
+            filter_edit.textChanged.connect(self.filter_timer.start)
+            filter_bar_layout.addWidget(filter_edit)
+            self.result_filter_edits.append(filter_edit)
+        self.result_table.proxy_model.filtersChanged.connect(self.sync_filter_bar)
+        left_layout.addWidget(filter_bar)
+
         left_layout.addWidget(self.result_table)
 
         self.main_loading_line = QLabel()
         self.main_loading_line.setFixedHeight(2)
         left_layout.addWidget(self.main_loading_line)
 
+        # Loaded rows and the size estimate of the paged main search
+        self.main_count_label = QLabel()
+        self.main_count_label.setMaximumWidth(525)
+        self.main_count_label.setWordWrap(True)
+        self.main_count_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        left_layout.addWidget(self.main_count_label)
+        self.main_search = None
+        self.result_table.verticalScrollBar().valueChanged.connect(self.main_results_scrolled)
+
         # Subresult search and box
         sub_search_container = QWidget()
         sub_search_layout = QHBoxLayout()
@@ -178,6 +1896,7 @@ class MainWindow(QMainWindow):
         self.sub_search_button.setIcon(QIcon('Search.png'))
         self.sub_search_button.setMaximumWidth(75)
         self.sub_search_button.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        self.sub_search_button.setToolTip("Shift+click to refresh from the database")
         self.sub_search_button.clicked.connect(self.sub_search_button_clicked)
         sub_search_layout.addWidget(self.sub_search_button)
 
@@ -185,8 +1904,6 @@ class MainWindow(QMainWindow):
         self.export_button.setIcon(QIcon('Export.png'))
         self.export_button.setMaximumWidth(75)
         self.export_button.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
-        self.export_button.clicked.connect(
-            lambda: self.export_table_to_csv(self.sub_result_table, self.sub_search_combo_box.currentText()))
         sub_search_layout.addWidget(self.export_button)
 
         left_layout.addWidget(sub_search_container)
@@ -195,11 +1912,27 @@ class MainWindow(QMainWindow):
         self.sub_result_table.setMaximumWidth(525)
         self.sub_result_table.setMaximumWidth(525)
         left_layout.addWidget(self.sub_result_table)
+        self.export_button.setMenu(
+            self.create_export_menu(self.sub_result_table, self.sub_search_combo_box.currentText))
 
         self.sub_loading_line = QLabel()
         self.sub_loading_line.setFixedHeight(2)
         left_layout.addWidget(self.sub_loading_line)
 
+        # Live row counter shown instead of the loading line while a sub-search is streaming
+        self.sub_stream_status = QLabel()
+        self.sub_stream_status.setMaximumWidth(525)
+        self.sub_stream_status.hide()
+        left_layout.addWidget(self.sub_stream_status)
+        self.bypass_cache = False
+        self.active_exports = set()  # QueryRequests of the running database exports
+
+        # Live refresh of the recent activity shown in the infoboxes (interval set from load_database_config)
+        self.live_checks = {}
+        self.infobox_activity = {}  # infobox -> what its recent activity table shows, see watch_recent_activity
+        self.live_timer = QTimer(self)
+        self.live_timer.timeout.connect(self.refresh_live_infoboxes)
+
         # Right side layout
         right_layout = QHBoxLayout()
         main_layout.addLayout(right_layout)
@@ -215,30 +1948,108 @@ class MainWindow(QMainWindow):
 
         # Load database configuration from config.ini
         self.load_database_config()
+        self.create_timings_panel()
+
+        self.description_indexes = {}
+        self.fulltext_unavailable = set()
+        self.replica_syncing = set()
+        self.sub_replica_table = None  # replicated table the sub-search is showing
 
         # Apply the dark mode initially
         self.set_dark_mode()
 
-    def load_database_config(self):
-        config = configparser.ConfigParser()
-        if hasattr(sys, '_MEIPASS'):
-            config_path = os.path.join(sys._MEIPASS, 'config.ini')
-        else:
-            config_path = os.path.join(os.path.dirname(__file__), 'config.ini')
+        # Everything that talks to the database starts once the window is up and the event loop runs
+        QTimer.singleShot(0, self.window_ready)
 
-        config.read(config_path)
+    def load_database_config(self):
+        config = read_config()
+        self.driver, self.connection_config = database_connection(config)
+
+        # Interactive queries are stopped on the server after query_timeout seconds (0 = no limit); the socket read
+        # timeout is a client-side backstop for servers that ignore the MAX_EXECUTION_TIME hint
+        query_config = config['query'] if 'query' in config else {}
+        self.query_timeout = int(query_config.get('timeout', 30))
+        pooled_config = dict(self.connection_config)
+        if self.query_timeout:
+            pooled_config['read_timeout'] = self.query_timeout + int(query_config.get('read_timeout_grace', 5))
+
+        metrics_config = config['metrics'] if 'metrics' in config else {}
+        log_file = metrics_config.get('log_file', '').strip()
+        self.query_metrics = QueryMetrics(log_path=os.path.expanduser(log_file) if log_file else None,
+                                          history=int(metrics_config.get('history', 500)))
+
+        pool_config = config['pool'] if 'pool' in config else {}
+        self.connection_pool = ConnectionPool(
+            pooled_config,
+            min_size=int(pool_config.get('min_size', 1)),
+            max_size=int(pool_config.get('max_size', 5)),
+            idle_timeout=int(pool_config.get('idle_timeout', 300)),
+            recycle=int(pool_config.get('recycle', 3600)),
+            metrics=self.query_metrics,
+            driver=self.driver)
+
+        search_config = config['search'] if 'search' in config else {}
+        self.search_settings = {
+            'fulltext': config_flag(search_config, 'fulltext'),
+            'fulltext_min_word': int(search_config.get('fulltext_min_word', 3)),
+            'local_index': config_flag(search_config, 'local_index'),
+            'local_index_refresh': int(search_config.get('local_index_refresh', 900)),
+            'as_you_type': config_flag(search_config, 'as_you_type'),
+            'typing_delay': int(search_config.get('typing_delay', 300)),
+            'typing_min_chars': int(search_config.get('typing_min_chars', 3)),
+            'page_size': max(int(search_config.get('page_size', 500)), 1),
+        }
+        self.search_timer.setInterval(self.search_settings['typing_delay'])
+        if self.search_settings['as_you_type']:
+            self.search_textbox.textChanged.connect(self.search_timer.start)
+
+        prefetch_config = config['prefetch'] if 'prefetch' in config else {}
+        self.prefetch_settings = {
+            'enabled': config_flag(prefetch_config, 'enabled'),
+            'delay': int(prefetch_config.get('delay', 250)),
+            'max_concurrent': max(int(prefetch_config.get('max_concurrent', 2)), 1),
+        }
+        self.prefetch_timer.setInterval(self.prefetch_settings['delay'])
+
+        startup_config = config['startup'] if 'startup' in config else {}
+        self.startup_settings = {
+            'prewarm_connections': int(startup_config.get('prewarm_connections', 2)),
+            'metadata': config_flag(startup_config, 'metadata', True),
+            'warm_up_queries': [query.strip() for query in startup_config.get('warm_up_queries', '').split(';')
+                                if query.strip()],
+            'report': config_flag(startup_config, 'report'),
+        }
 
-        # some of the DBs not use database as parameter to connect
-        if 'database' not in config:
-            raise KeyError("Config file is missing the 'database' section")
+        live_config = config['live'] if 'live' in config else {}
+        self.live_timer.setInterval(max(int(live_config.get('interval', 15)), 1) * 1000)
 
-        self.connection_config = {
-            'host': config['database'].get('host', ''),
-            'user': config['database'].get('user', ''),
-            'password': config['database'].get('password', ''),
-            'database': config['database'].get('database', ''),
-            'port': int(config['database'].get('port', 3306))
+        cache_config = config['cache'] if 'cache' in config else {}
+        self.query_cache = QueryCache(max_bytes=int(float(cache_config.get('max_mb', 64)) * 1024 * 1024))
+        self.cache_ttls = {
+            'activity': int(cache_config.get('activity_ttl', 30)),
+            'fixtures': int(cache_config.get('fixtures_ttl', 60)),
+            'reference': int(cache_config.get('reference_ttl', 3600)),
         }
+        replica_config = config['replica'] if 'replica' in config else {}
+        self.replica = None
+        if config_flag(replica_config, 'enabled'):
+            tables = [table.strip() for table in replica_config.get('tables', 'table3, table4').split(',')
+                      if table.strip()]
+            replica_path = os.path.expanduser(replica_config.get('path', '').strip()
+                                              or os.path.join("~", "Documents", "Ez Search", "reference_tables.db"))
+            try:
+                os.makedirs(os.path.dirname(replica_path) or ".", exist_ok=True)
+                self.replica = ReferenceReplica(replica_path, {
+                    table: {'key': replica_config.get(f'{table}_key', 'Col1'),
+                            'updated': replica_config.get(f'{table}_updated', '').strip() or None}
+                    for table in tables}, driver=self.driver)
+            except (OSError, sqlite3.Error) as e:
+                print(f"Could not open the local copy of the reference tables at {replica_path}: {e}")
+            self.replica_sync_interval = int(replica_config.get('sync_interval', 600))
+
+        # Workers spend their time waiting on the server, so size the thread pool to the connection pool
+        # rather than to the number of CPU cores
+        self.thread_pool.setMaxThreadCount(max(self.connection_pool.max_size, 2))
 
     def create_info_box(self, placeholder, option1, option2, option3, option4, option5, search_button_slot):
         frame = QFrame()
@@ -257,9 +2068,17 @@ class MainWindow(QMainWindow):
         search_button = QPushButton("Search", self)
         search_button.setIcon(QIcon('Search.png'))
         search_button.setMaximumWidth(75)
+        search_button.setToolTip("Shift+click to refresh from the database")
         search_button.clicked.connect(search_button_slot)
         combo_layout.addWidget(search_button)
 
+        live_check = QCheckBox("Live", self)
+        live_check.setToolTip("Keep Option3-5 results up to date: new rows are added and rows older than "
+                              f"{self.ACTIVITY_DAYS} days removed")
+        live_check.toggled.connect(lambda checked: self.live_refresh_toggled(placeholder, checked))
+        combo_layout.addWidget(live_check)
+        self.live_checks[placeholder] = live_check
+
         export_button = QPushButton("Export", self)
         export_button.setIcon(QIcon('Export.png'))
         export_button.setMaximumWidth(75)
@@ -278,32 +2097,64 @@ class MainWindow(QMainWindow):
             self.info_table1 = info_table
             self.combo_box_info3 = combo_box
             self.info_loading_line1 = loading_line
-            export_button.clicked.connect(
-                lambda: self.export_table_to_csv(self.info_table1, self.combo_box_info3.currentText()))
         else:
             self.info_table2 = info_table
             self.combo_box_info4 = combo_box
             self.info_loading_line2 = loading_line
-            export_button.clicked.connect(
-                lambda: self.export_table_to_csv(self.info_table2, self.combo_box_info4.currentText()))
+        export_button.setMenu(self.create_export_menu(info_table, combo_box.currentText))
 
         # Adjust columns based on the text in these specific fields
         adjust_columns = ["Col1", "Col2", "Col3", "Col4", "Col5", "Col6", "Col7",
                           "Col8", "Col9", "Col10", "Col11"]
-        for i in range(info_table.columnCount()):
-            if info_table.horizontalHeaderItem(i).text() in adjust_columns:
+        for i, column_name in enumerate(info_table.header_labels()):
+            if column_name in adjust_columns:
                 info_table.resizeColumnToContents(i)
 
         return frame
 
     @pyqtSlot()
     def search_textbox_keydown(self):
+        # Enter searches right away; Shift+Enter always goes to the database
+        self.search_timer.stop()
+        self.search(self.search_textbox.text(), refresh=self.refresh_requested())
+
+    @pyqtSlot()
+    def search_as_you_type(self):
         search_text = self.search_textbox.text()
+        if search_text.isdigit() or len(search_text.strip()) >= self.search_settings['typing_min_chars']:
+            self.search(search_text)
+
+    def search(self, search_text, refresh=False):
+        ids = self.batch_ids(search_text)
+        if ids is not None:
+            self.search_database_for_id_batch(ids)
+            return
+        if not refresh and self.can_refine_locally(search_text):
+            # Every row matching the new text is already loaded, so narrow them down instead of querying again
+            self.result_table.proxy_model.set_search_filter(3, search_text)
+            return
         if search_text.isdigit():
             self.search_database_for_numeric_info(search_text)
         else:
             self.search_database_for_text_info(search_text)
 
+    def can_refine_locally(self, search_text):
+        # True when search_text only narrows the last server search: both are description substring searches,
+        # the new text contains the old one and that search returned all of its rows
+        base = self.main_search_base
+        return (base is not None and base['substring'] and not search_text.isdigit()
+                and self.is_substring_search(search_text) and base['text'] in search_text.lower())
+
+    def is_substring_search(self, search_text):
+        # Whether the server answers search_text with plain substring semantics that a local filter reproduces:
+        # LIKE without wildcards in the text, or the local index; not FULLTEXT word matching
+        if '%' in search_text or '_' in search_text:
+            return False
+        if not (self.search_settings['fulltext'] and self.fulltext_query(search_text)):
+            return True
+        return all(table in self.description_indexes or table in self.fulltext_unavailable
+                   for table in ("table5", "table6"))
+
     @pyqtSlot()
     def search_button_clicked_info3(self):
         self.search_button_clicked("Infobox1")
@@ -313,591 +2164,1553 @@ class MainWindow(QMainWindow):
         self.search_button_clicked("Infobox2")
 
     def search_button_clicked(self, infobox):
-        selected_items = self.result_table.selectedItems()
-        if not selected_items:
+        selected_values = self.result_table.selected_row_values()
+        if not selected_values:
             return
 
-        selected_row = selected_items[0].row()
-        package_id = self.result_table.item(selected_row, 2).text()
+        package_id = str(selected_values[2])
 
         if infobox == "Infobox1":
             selection = self.combo_box_info3.currentText()
         else:
             selection = self.combo_box_info4.currentText()
 
-        self.handle_selection_async(selection, infobox, package_id)
+        self.handle_selection_async(selection, infobox, package_id, refresh=self.refresh_requested())
 
     def result_table_selection_changed(self):
-        selected_items = self.result_table.selectedItems()
-        if not selected_items:
+        selected_values = self.result_table.selected_row_values()
+        if not selected_values:
             return
+        self.schedule_prefetch(selected_values[2])
+
+    def result_table_row_hovered(self, index):
+        if index.isValid():
+            self.schedule_prefetch(self.result_table.row_values(index.row())[2])
 
     @pyqtSlot()
     def sub_search_button_clicked(self):
         selected_table = self.sub_search_combo_box.currentText()
         self.set_loading_line(self.sub_loading_line, True)
-        QTimer.singleShot(1000, lambda: self.query_sub_search_data(selected_table))
-
-    def query_sub_search_data(self, selected_table):
-        if selected_table == "SubOption1":
-            self.query_sub_option1()
-        elif selected_table == "SubOption2":
-            self.query_sub_option2()
-        elif selected_table == "SubOption3":
-            self.query_sub_option3()
-        # Add more elif clauses for other subsearch options
-
-    def query_sub_option1(self):
+        self.query_sub_search_data(selected_table, refresh=self.refresh_requested())
+
+    def query_sub_search_data(self, selected_table, refresh=False):
+        self.start_request('sub')
+        self.sub_replica_table = None
+        with self.cache_bypassed(refresh):
+            if selected_table == "SubOption1":
+                self.query_sub_option1()
+            elif selected_table == "SubOption2":
+                self.query_sub_option2()
+            elif selected_table == "SubOption3":
+                self.query_sub_option3()
+            # Add more elif clauses for other subsearch options
+
+    def refresh_requested(self):
+        # Shift+click on a Search button skips the result cache and re-reads from the database
+        return bool(QApplication.keyboardModifiers() & Qt.ShiftModifier)
+
+    @contextmanager
+    def cache_bypassed(self, bypass):
+        # Cache lookups happen on the GUI thread while a query is being dispatched, so a plain flag is enough
+        previous = self.bypass_cache
+        self.bypass_cache = previous or bypass
         try:
-            connection = pymysql.connect(**self.connection_config)
-            cursor = connection.cursor()
-
-            query = """
-                SELECT s.Col1, GROUP_CONCAT(DISTINCT s.Col2) AS Col2, f.Col3
-                FROM table1 s
-                JOIN table2 f ON s.Col1 = f.Col1
-                WHERE f.Col3 > NOW()
-                GROUP BY s.Col1, f.Col3;
-            """
-            cursor.execute(query)
-            results = cursor.fetchall()
-
-            connection.commit()
-
-        except pymysql.MySQLError as e:
-            results = []
-        except Exception as e:
-            results = []
+            yield
         finally:
-            cursor.close()
-            connection.close()
-
-        self.display_subsearch_results(results)
-
-    def query_sub_option2(self):
+            self.bypass_cache = previous
+
+    def cached_result(self, cache_key):
+        if self.bypass_cache:
+            return False, None
+        hit, value = self.query_cache.get(cache_key)
+        self.update_cache_status()
+        return hit, value
+
+    def update_cache_status(self):
+        cache = self.query_cache
+        self.statusBar().showMessage(
+            f"Cache: {cache.hits} hits · {cache.misses} misses · {cache.size_bytes() / (1024 * 1024):.1f} MB")
+
+    def start_request(self, panel):
+        # Supersedes the panel's previous request: its results are dropped and its statements killed on the server
+        previous = self.panel_requests.get(panel)
+        if previous is not None:
+            self.cancel_request(previous)
+        request = self.panel_requests[panel] = QueryRequest()
+        return request
+
+    def cancel_request(self, request):
+        request.cancelled = True
+        self.kill_pool.start(QueryWorker(request.kill, self.kill_query))
+
+    def kill_query(self, thread_id):
+        # Runs on the kill thread
         try:
-            connection = pymysql.connect(**self.connection_config)
-            cursor = connection.cursor()
-
-            query = """
-                SELECT Col1, Col2, Col3, Col4
-                FROM table3;
-            """
-            cursor.execute(query)
-            results = cursor.fetchall()
-
+            if self.kill_connection is None:
+                self.kill_connection = self.driver.connect(**self.connection_config)
+            else:
+                try:
+                    self.driver.ping(self.kill_connection)
+                except self.driver.Error:
+                    self.kill_connection = self.driver.connect(**self.connection_config)
+            with self.kill_connection.cursor() as cursor:
+                cursor.execute("KILL QUERY %s", (thread_id,))
+        except self.driver.Error as e:
+            if e.args and e.args[0] == self.ER_NO_SUCH_THREAD:
+                return  # the statement finished on its own in the meantime
+            print(f"Could not cancel query on server thread {thread_id}: {e}")
+
+    def with_time_limit(self, query):
+        # MySQL 5.7.8+ aborts a SELECT on the server once the hinted time is up; other servers ignore the comment
+        if not self.query_timeout:
+            return query
+        return re.sub(r'^\s*SELECT\b', f"SELECT /*+ MAX_EXECUTION_TIME({self.query_timeout * 1000}) */", query,
+                      count=1, flags=re.IGNORECASE)
+
+    def run_in_background(self, fn, *args, on_result=None, on_error=None, on_progress=None, cache_key=None,
+                          cache_ttl=0, request=None, label=None):
+        metrics = self.query_metrics
+        stats = QueryStats(label or self.task_label(fn, args))
+        if request is not None:
+            # Connections used by fn are tracked for cancellation; once the request has been superseded nothing
+            # it produces reaches the GUI (results still go to the cache, they are valid, just no longer wanted)
+            task, deliver_result, deliver_error, deliver_progress = fn, on_result, on_error, on_progress
+
+            def fn(*args, **kwargs):
+                if request.cancelled:
+                    raise QueryCancelled()  # superseded while the worker was queued
+                with self.connection_pool.tracking(request):
+                    return task(*args, **kwargs)
+
+            def current(deliver):
+                if deliver is None:
+                    return None
+                return lambda value: None if request.cancelled else deliver(value)
+
+            on_result, on_error, on_progress = (current(deliver_result), current(deliver_error),
+                                                current(deliver_progress))
+
+        if cache_key is not None:
+            hit, value = self.cached_result(cache_key)
+            if hit:
+                stats.cached = True
+                stats.rows = len(value) if isinstance(value, list) else 0
+                if on_result:
+                    metrics.rendering(stats, on_result)(value)
+                self.record_query_stats(stats)
+                return
+
+            prefetch = self.prefetches.get(cache_key)
+            if prefetch is not None and not prefetch['request'].cancelled and not self.bypass_cache:
+                # Already being prefetched: wait for that query instead of running it a second time. The wait and
+                # the render are still recorded, the prefetch's own stats hold the database time.
+                stats.prefetched = True
+                joined_at = time.perf_counter()
+
+                def joined(deliver, failed):
+                    def deliver_joined(value):
+                        if failed:
+                            stats.error = f"{type(value).__name__}: {value}"
+                            stats.cancelled = isinstance(value, QueryCancelled)
+                        else:
+                            stats.rows = len(value) if isinstance(value, list) else 0
+                        if deliver:
+                            metrics.rendering(stats, deliver)(value)
+                        stats.total = time.perf_counter() - joined_at
+                        self.record_query_stats(stats, request)
+
+                    return deliver_joined
+
+                prefetch['waiters'].append((joined(on_result, False), joined(on_error, True)))
+                return
+
+            deliver = on_result
+
+            def on_result(value):
+                self.query_cache.put(cache_key, value, cache_ttl)
+                self.update_cache_status()
+                if deliver:
+                    deliver(value)
+
+        measured_task = fn
+
+        def fn(*args, **kwargs):
+            with metrics.measuring(stats):
+                result = measured_task(*args, **kwargs)
+                if not stats.rows and isinstance(result, list):
+                    metrics.count_rows(result)
+                return result
+
+        def failed(error):
+            stats.error = f"{type(error).__name__}: {error}"
+            stats.cancelled = isinstance(error, QueryCancelled)
+
+        def finished():
+            self.active_workers.discard(signals)
+            self.record_query_stats(stats, request)
+
+        worker = QueryWorker(fn, *args)
+        signals = worker.signals
+        signals.error.connect(failed)
+        if on_result:
+            signals.result.connect(metrics.rendering(stats, on_result))
+        if on_error:
+            signals.error.connect(metrics.rendering(stats, on_error))
+        if on_progress:
+            worker.kwargs['progress_callback'] = signals.progress.emit
+            signals.progress.connect(metrics.rendering(stats, on_progress))
+        # Keep the signal object alive until the queued result has been delivered
+        self.active_workers.add(signals)
+        signals.finished.connect(finished)
+        self.thread_pool.start(worker)
+
+    @staticmethod
+    def task_label(fn, args):
+        # Names a background query in the timings panel: the function, and the table when it is given SQL
+        label = getattr(fn, '__name__', 'query')
+        if args and isinstance(args[0], str):
+            match = re.search(r'\bFROM\s+(\w+)', args[0], re.IGNORECASE)
+            if match:
+                label += f" {match.group(1)}"
+        return label
+
+    def record_query_stats(self, stats, request=None):
+        stats.cancelled = stats.cancelled or (request is not None and request.cancelled)
+        metrics = self.query_metrics
+        metrics.record(stats)
+        errors = f" · {metrics.errors} failed" if metrics.errors else ""
+        self.metrics_label.setText(stats.summary() + errors)
+        self.metrics_label.setToolTip(stats.error or "")
+
+        if self.timings_table is None:
+            return
+        if self.timings_table.source_model.rowCount() >= metrics.history.maxlen:
+            self.timings_table.set_results(self.TIMINGS_COLUMNS, [self.timings_row(item) for item in metrics.history])
+        else:
+            self.timings_table.append_rows([self.timings_row(stats)])
+
+    @staticmethod
+    def timings_row(stats):
+        milliseconds = [round(stats.timings[phase] * 1000, 1) for phase in QueryStats.PHASES]
+        return [stats.started_at.strftime('%H:%M:%S'), stats.label, *milliseconds, round(stats.total * 1000, 1),
+                stats.rows, round(stats.bytes / 1024, 1), stats.error or stats.status()]
+
+    def create_timings_panel(self):
+        # Dock listing the recent background queries; toggled from the status bar. Its table is built the first
+        # time the dock is opened, from the kept history.
+        self.timings_table = None
+        self.timings_dock = dock = QDockWidget("Query timings", self)
+        dock.setObjectName("timings_dock")
+        dock.visibilityChanged.connect(self.create_timings_table)
+        self.addDockWidget(Qt.BottomDockWidgetArea, dock)
+        dock.hide()
+
+        self.metrics_label = QLabel()
+        timings_button = QToolButton()
+        timings_button.setDefaultAction(dock.toggleViewAction())
+        self.statusBar().addPermanentWidget(self.metrics_label)
+        self.statusBar().addPermanentWidget(timings_button)
+
+    def create_timings_table(self, visible):
+        if not visible or self.timings_table is not None:
+            return
+        self.timings_table = CustomTableWidget()
+        self.timings_table.set_results(self.TIMINGS_COLUMNS,
+                                       [self.timings_row(item) for item in self.query_metrics.history])
+        self.timings_dock.setWidget(self.timings_table)
+
+    def window_ready(self):
+        self.mark_startup('interactive')
+        # The first connections are opened and the tables touched before anything else queries the database, so
+        # a search typed right away does not pay for connection setup; the local index build and the reference
+        # sync, which would compete with it for connections, wait until the warm-up is done
+        self.run_in_background(self.connection_pool.prewarm, self.startup_settings['prewarm_connections'],
+                               on_result=self.connections_warmed_up, on_error=self.warm_up_failed,
+                               label="warm-up connections")
+
+    def connections_warmed_up(self, opened):
+        self.mark_startup('connected')
+        self.run_in_background(self.warm_up_tables, on_result=self.tables_warmed_up, on_error=self.warm_up_failed,
+                               label="warm-up tables")
+
+    def warm_up_tables(self):
+        # Runs on a worker thread. Reading the column metadata opens every panel table on the server, and reports
+        # missing ones before a panel runs into them; returns the main search tables without a FULLTEXT index.
+        def warm_up(connection):
+            no_fulltext = set()
+            with connection.cursor() as cursor:
+                if self.startup_settings['metadata']:
+                    for table in self.PANEL_TABLES:
+                        try:
+                            cursor.execute(f"SELECT * FROM {table} LIMIT 0")
+                            cursor.fetchall()
+                            if self.search_settings['fulltext'] and table in ("table5", "table6"):
+                                cursor.execute(f"SHOW INDEX FROM {table} "
+                                               f"WHERE Index_type = 'FULLTEXT' AND Column_name = 'Col4'")
+                                if not cursor.fetchall():
+                                    no_fulltext.add(table)
+                        except self.driver.ProgrammingError as e:
+                            print(f"Could not read the columns of {table}: {e}")
+                for query in self.startup_settings['warm_up_queries']:
+                    try:
+                        cursor.execute(self.with_time_limit(query))
+                        cursor.fetchall()
+                    except self.driver.Error as e:
+                        print(f"Warm-up query failed: {query}: {e}")
             connection.commit()
-
-        except pymysql.MySQLError as e:
-            results = []
-        except Exception as e:
-            results = []
-        finally:
-            cursor.close()
-            connection.close()
-
-        self.display_subsearch_results_providers(results)
-
-    def query_sub_option3(self):
-        try:
-            connection = pymysql.connect(**self.connection_config)
-            cursor = connection.cursor()
-
-            query = """
-                SELECT Col1, Col2, Col3
-                FROM table4;
-            """
-            cursor.execute(query)
-            results = cursor.fetchall()
-
+            return no_fulltext
+
+        return self.connection_pool.run(warm_up)
+
+    def tables_warmed_up(self, no_fulltext):
+        for table in no_fulltext:
+            print(f"No FULLTEXT index on {table}.Col4, description searches use LIKE")
+        self.fulltext_unavailable.update(no_fulltext)
+        self.mark_startup('warm')
+        self.start_deferred_work()
+
+    def warm_up_failed(self, error):
+        print(f"Could not warm up the database connection: {error}")
+        self.start_deferred_work()
+
+    def start_deferred_work(self):
+        if self.search_settings['local_index']:
+            self.refresh_description_indexes()
+            self.index_refresh_timer = QTimer(self)
+            self.index_refresh_timer.timeout.connect(self.refresh_description_indexes)
+            self.index_refresh_timer.start(self.search_settings['local_index_refresh'] * 1000)
+
+        if self.replica is not None:
+            self.sync_replica()
+            self.replica_sync_timer = QTimer(self)
+            self.replica_sync_timer.timeout.connect(self.sync_replica)
+            self.replica_sync_timer.start(self.replica_sync_interval * 1000)
+
+    def mark_startup(self, event):
+        # Seconds from launch to each startup milestone, shown in the status bar until the first search result
+        if event in self.startup_timings:
+            return
+        self.startup_timings[event] = time.perf_counter() - self.started_at
+        message = "Startup: " + " · ".join(f"{self.STARTUP_EVENTS[name]} in {seconds:.2f} s"
+                                           for name, seconds in self.startup_timings.items())
+        self.statusBar().showMessage(message, 60000)
+        if self.startup_settings['report']:
+            print(message)
+
+    def fetch_all(self, query, params=None, time_limit=True):
+        # Runs on a worker thread, so it must not touch any widget. time_limit=False for bulk reads: the server
+        # counts the time spent sending rows against MAX_EXECUTION_TIME.
+        metrics = self.query_metrics
+        if time_limit:
+            query = self.with_time_limit(query)
+
+        def execute(connection):
+            with connection.cursor() as cursor:
+                # The default cursor reads the whole result inside execute(), so transfer counts as execute time
+                with metrics.timed('execute'):
+                    cursor.execute(query, params)
+                with metrics.timed('fetch'):
+                    results = ResultRows(cursor.fetchall(), cursor.description)
             connection.commit()
-
-        except pymysql.MySQLError as e:
-            results = []
-        except Exception as e:
-            results = []
-        finally:
-            cursor.close()
-            connection.close()
-
-        self.display_subsearch_results_languages(results)
-
-    def display_subsearch_results(self, results):
-        self.sub_result_table.setRowCount(0)
-        if not results:
-            self.sub_result_table.setRowCount(1)
-            self.sub_result_table.setItem(0, 0, QTableWidgetItem("No results found."))
+            metrics.count_rows(results)
+            return results
+
+        return self.connection_pool.run(execute)
+
+    def fetch_streaming(self, query, params=None, time_limit=True, progress_callback=None):
+        # Unbuffered server-side cursor: rows are handed over in batches as they arrive instead of after fetchall()
+        row_count = 0
+        metrics = self.query_metrics
+        with self.connection_pool.connection() as connection:
+            with connection.cursor(self.driver.streaming_cursor) as cursor:
+                with metrics.timed('execute'):
+                    cursor.execute(self.with_time_limit(query) if time_limit else query, params)
+                while True:
+                    with metrics.timed('fetch'):
+                        rows = cursor.fetchmany(self.STREAM_BATCH_SIZE)
+                    if not rows:
+                        break
+                    metrics.count_rows(rows)
+                    row_count += len(rows)
+                    progress_callback(ResultRows(rows, cursor.description))
+            connection.commit()
+        return row_count
+
+    def stream_sub_search(self, query, schema):
+        started = time.monotonic()
+        fetched = [0]
+
+        self.sub_result_table.set_source_query(query, convert_rows=schema.convert_rows,
+                                               flag_columns=schema.flag_columns())
+
+        self.sub_result_table.set_schema_results(schema, [])
+        self.sub_result_table.suspend_sorting()
+        self.sub_loading_line.hide()
+        self.sub_stream_status.setText("Fetching...")
+        self.sub_stream_status.show()
+
+        cache_key = (query, None)
+        hit, cached_rows = self.cached_result(cache_key)
+        if hit:
+            stats = QueryStats(self.task_label(self.fetch_streaming, (query,)))
+            stats.cached = True
+            stats.rows = len(cached_rows)
+            with self.query_metrics.measuring(stats), self.query_metrics.timed('render'):
+                self.sub_result_table.append_schema_results(schema, cached_rows)
+            if not cached_rows:
+                self.sub_result_table.show_message("No results found.")
+            self.sub_result_table.resume_sorting()
+            self.sub_stream_status.setText(f"{len(cached_rows):,} rows from cache")
             self.set_loading_line(self.sub_loading_line, False)
+            self.record_query_stats(stats)
             return
 
-        columns = ["Col1", "Col2", "Col3"]
-        self.sub_result_table.setColumnCount(len(columns))
-        self.sub_result_table.setHorizontalHeaderLabels(columns)
+        # Rows are kept for the cache only while they fit; a stream larger than the cache is not retained
+        received = ResultRows()
+        received_bytes = [0]
+
+        def on_batch(rows):
+            if not fetched[0]:
+                received.description = rows.description
+            received_bytes[0] += QueryCache.estimate_size(rows)
+            if received_bytes[0] <= self.query_cache.max_bytes:
+                received.extend(rows)
+            fetched[0] += len(rows)
+            self.sub_result_table.append_schema_results(schema, rows)
+            elapsed = max(time.monotonic() - started, 1e-6)
+            self.sub_stream_status.setText(f"{fetched[0]:,} rows fetched · {fetched[0] / elapsed:,.0f} rows/s")
+
+        def on_done(row_count):
+            if not row_count:
+                self.sub_result_table.show_message("No results found.")
+            self.sub_result_table.resume_sorting()
+            if received_bytes[0] <= self.query_cache.max_bytes:
+                self.query_cache.put(cache_key, received, self.cache_ttls['reference'])
+                self.update_cache_status()
+            elapsed = time.monotonic() - started
+            self.sub_stream_status.setText(f"{row_count:,} rows in {elapsed:.2f}s")
+            self.set_loading_line(self.sub_loading_line, False)
 
-        for row in results:
-            row_position = self.sub_result_table.rowCount()
-            self.sub_result_table.insertRow(row_position)
-            for col_idx, col_val in enumerate(row):
-                self.sub_result_table.setItem(row_position, col_idx, QTableWidgetItem(str(col_val)))
+        def on_error(error):
+            print(f"Error streaming sub-search: {error}")
+            self.sub_result_table.resume_sorting()
+            self.sub_result_table.show_message("No results found.")
+            self.sub_stream_status.setText("Error querying database. Check console for details.")
+            self.set_loading_line(self.sub_loading_line, False)
 
-        self.set_loading_line(self.sub_loading_line, False)
+        # Whole reference tables: reading them to the end can take longer than the interactive time limit
+        self.run_in_background(self.fetch_streaming, query, None, False, on_result=on_done, on_error=on_error,
+                               on_progress=on_batch, request=self.panel_requests['sub'])
 
-    def display_subsearch_results_providers(self, results):
-        self.sub_result_table.setRowCount(0)
-        if not results:
-            self.sub_result_table.setRowCount(1)
-            self.sub_result_table.setItem(0, 0, QTableWidgetItem("No results found."))
-            self.set_loading_line(self.sub_loading_line, False)
-            return
+    def query_sub_option1(self):
+        self.sub_stream_status.hide()
+        self.sub_loading_line.show()
+        query = """
+            SELECT s.Col1, GROUP_CONCAT(DISTINCT s.Col2) AS Col2, f.Col3
+            FROM table1 s
+            JOIN table2 f ON s.Col1 = f.Col1
+            WHERE f.Col3 > NOW()
+            GROUP BY s.Col1, f.Col3;
+        """
+        self.sub_result_table.set_source_query(query)
+        self.run_in_background(self.fetch_all, query,
+                               on_result=lambda results: self.display_subsearch_results(results, self.FIXTURES_SCHEMA),
+                               on_error=lambda e: self.display_subsearch_results([], self.FIXTURES_SCHEMA),
+                               cache_key=(query, None), cache_ttl=self.cache_ttls['fixtures'],
+                               request=self.panel_requests['sub'])
 
-        columns = ["Col1", "Col2", "Col3", "Col4"]
-        self.sub_result_table.setColumnCount(len(columns))
-        self.sub_result_table.setHorizontalHeaderLabels(columns)
+    def query_sub_option2(self):
+        query = """
+            SELECT Col1, Col2, Col3, Col4
+            FROM table3;
+        """
 
-        for row in results:
-            row_position = self.sub_result_table.rowCount()
-            self.sub_result_table.insertRow(row_position)
-            for col_idx, col_val in enumerate(row):
-                if columns[col_idx] in ["Col2", "Col3", "Col4"]:
-                    col_val = "Yes" if col_val == b'\x01' else "Yes" if col_val == 1 else "No"
-                self.sub_result_table.setItem(row_position, col_idx, QTableWidgetItem(str(col_val)))
+        if self.replicated("table3"):
+            self.query_sub_replica("table3", query, self.PROVIDER_SCHEMA)
+        else:
+            self.stream_sub_search(query, self.PROVIDER_SCHEMA)
 
-        self.set_loading_line(self.sub_loading_line, False)
+    def query_sub_option3(self):
+        query = """
+            SELECT Col1, Col2, Col3
+            FROM table4;
+        """
 
-    def display_subsearch_results_languages(self, results):
-        self.sub_result_table.setRowCount(0)
+        if self.replicated("table4"):
+            self.query_sub_replica("table4", query, self.LANGUAGE_SCHEMA)
+        else:
+            self.stream_sub_search(query, self.LANGUAGE_SCHEMA)
+
+    def replicated(self, table):
+        # Whether table has a local copy that has been synced at least once
+        return self.replica is not None and table in self.replica.synced
+
+    def query_sub_replica(self, table, query, schema):
+        # Answers a sub-search from the local copy; Shift+click syncs the copy with the server first. If the copy
+        # cannot be read the sub-search goes to the server as usual.
+        refresh = self.bypass_cache
+        self.sub_stream_status.hide()
+        self.sub_loading_line.show()
+        self.sub_result_table.set_source_query(query, convert_rows=schema.convert_rows,
+                                               flag_columns=schema.flag_columns())
+
+        def load():
+            if refresh:
+                self.sync_replica_table(table, force=True)
+            return self.replica.read(table, query)
+
+        def show(results):
+            self.display_subsearch_results(results, schema)
+            self.sub_replica_table = table
+            self.show_replica_status(table)
+
+        def on_error(error):
+            print(f"Could not read the local copy of {table}: {error}")
+            self.stream_sub_search(query, schema)
+
+        self.run_in_background(load, on_result=show, on_error=on_error, request=self.panel_requests['sub'],
+                               label=f"local copy {table}")
+
+    def show_replica_status(self, table):
+        self.sub_stream_status.setText(f"Local copy, last synced {self.replica.synced[table]:%Y-%m-%d %H:%M:%S} · "
+                                       f"Shift+click Search to sync now")
+        self.sub_stream_status.show()
+
+    def sync_replica(self):
+        for table in self.replica.tables:
+            if table in self.replica_syncing:
+                continue
+            self.replica_syncing.add(table)
+            self.run_in_background(self.sync_replica_table, table,
+                                   on_result=lambda transferred, table=table: self.replica_synced(table, transferred),
+                                   on_error=lambda e, table=table: self.replica_sync_failed(table, e),
+                                   label=f"sync local copy {table}")
+
+    def sync_replica_table(self, table, force=False):
+        return self.connection_pool.run(lambda connection: self.replica.sync(table, connection, force))
+
+    def replica_synced(self, table, transferred):
+        self.replica_syncing.discard(table)
+        if transferred:
+            self.statusBar().showMessage(f"Local copy of {table} synced: {transferred:,} rows transferred", 5000)
+        if table == self.sub_replica_table:
+            self.show_replica_status(table)
+
+    def replica_sync_failed(self, table, error):
+        self.replica_syncing.discard(table)
+        print(f"Could not sync the local copy of {table}: {error}")
+
+    def display_subsearch_results(self, results, schema):
         if not results:
-            self.sub_result_table.setRowCount(1)
-            self.sub_result_table.setItem(0, 0, QTableWidgetItem("No results found."))
+            self.sub_result_table.show_message("No results found.")
             self.set_loading_line(self.sub_loading_line, False)
             return
 
-        columns = ["Col1", "Col2", "Col3"]
-        self.sub_result_table.setColumnCount(len(columns))
-        self.sub_result_table.setHorizontalHeaderLabels(columns)
-
-        for row in results:
-            row_position = self.sub_result_table.rowCount()
-            self.sub_result_table.insertRow(row_position)
-            for col_idx, col_val in enumerate(row):
-                self.sub_result_table.setItem(row_position, col_idx, QTableWidgetItem(str(col_val)))
+        self.sub_result_table.set_schema_results(schema, results)
 
         self.set_loading_line(self.sub_loading_line, False)
 
     def search_database_for_numeric_info(self, search_value):
         self.set_loading_line(self.main_loading_line, True)
-        QTimer.singleShot(1000, lambda: self.query_numeric_info(search_value))
+        self.query_numeric_info(search_value)
 
     def query_numeric_info(self, search_value):
-        connection = pymysql.connect(**self.connection_config)
-        cursor = connection.cursor()
-
-        query1 = """
-            SELECT Col1, Col2, Col3, Col4, Col5, Col6, Col7
-            FROM table5
-            WHERE Col3 = %s OR Col1 = %s;
-        """
-
-        query2 = """
-            SELECT Col1, Col2, Col3, Col4, Col5, Col6, Col7
-            FROM table6
-            WHERE Col3 = %s OR Col1 = %s;
-        """
-
-        try:
-            cursor.execute(query1, (search_value, search_value))
-            results1 = cursor.fetchall()
-
-            cursor.execute(query2, (search_value, search_value))
-            results2 = cursor.fetchall()
-
-            self.result_table.setRowCount(0)
-
-            if not results1 and not results2:
-                self.result_table.setRowCount(1)
-                self.result_table.setItem(0, 0, QTableWidgetItem("No results found."))
-            else:
-                self.add_results_to_table(results1, "Source1")
-                self.add_results_to_table(results2, "Source2")
-
-            connection.commit()
-        except Exception as e:
-            print(f"Error querying database: {e}")
-            self.result_table.setRowCount(1)
-            self.result_table.setItem(0, 0, QTableWidgetItem("Error querying database. Check console for details."))
-        finally:
-            cursor.close()
-            connection.close()
-
-        self.set_loading_line(self.main_loading_line, False)
+        condition = "Col3 = %s OR Col1 = %s"
+        params = (search_value, search_value)
+        self.run_main_search(search_value, [
+            (source,
+             lambda after, table=table: self.fetch_main_page(table, condition, params, after),
+             lambda table=table: self.estimate_main_count(table, condition, params))
+            for source, table in (("Source1", "table5"), ("Source2", "table6"))])
 
     def search_database_for_text_info(self, search_text):
         self.set_loading_line(self.main_loading_line, True)
-        QTimer.singleShot(1000, lambda: self.query_text_info(search_text))
+        self.query_text_info(search_text)
 
     def query_text_info(self, search_text):
-        connection = pymysql.connect(**self.connection_config)
-        cursor = connection.cursor()
+        self.run_main_search(search_text, [
+            (source,
+             lambda after, table=table: self.fetch_description_matches(table, search_text, after),
+             lambda table=table: self.estimate_description_matches(table, search_text))
+            for source, table in (("Source1", "table5"), ("Source2", "table6"))])
+
+    @staticmethod
+    def batch_ids(search_text):
+        # The IDs of a pasted list (one per line, or separated by commas or semicolons) without duplicates, or None
+        # when the text is a search term. Spaces alone do not make a list: "123 456" stays a description search.
+        if not re.search(r'[\n,;]', search_text):
+            return None
+        tokens = re.split(r'[\s,;]+', search_text.strip(' \t\r\n,;'))
+        if len(tokens) < 2 or not all(token.isdigit() for token in tokens):
+            return None
+        return list(dict.fromkeys(int(token) for token in tokens))
+
+    def search_database_for_id_batch(self, ids):
+        self.set_loading_line(self.main_loading_line, True)
+        self.query_id_batch(ids)
+
+    def query_id_batch(self, ids):
+        # Every ID is looked up as a package and a customer id like a numeric search, but in chunked IN queries on
+        # one connection per table instead of two queries per ID. IDs that match nothing are reported once both
+        # tables have answered.
+        request = self.start_request('main')
+        self.main_search_base = None
+        self.main_search = None
+        search = {'ids': ids, 'pending': 2, 'cleared': False, 'rows': 0, 'errors': 0, 'found': set()}
+        self.main_count_label.setText(f"Looking up {len(ids):,} IDs...")
+        self.main_count_label.setToolTip("")
+        for source, table in (("Source1", "table5"), ("Source2", "table6")):
+            self.run_in_background(
+                self.fetch_id_batch, table, ids,
+                on_result=lambda results, source=source: self.display_id_batch(search, source, results),
+                on_error=lambda error, source=source: self.display_id_batch(search, source, None, error),
+                request=request, label=f"batch lookup {source}")
+
+    def fetch_id_batch(self, table, ids):
+        def lookup(connection):
+            results = ResultRows()
+            seen = set()
+            with connection.cursor() as cursor:
+                for start in range(0, len(ids), self.BATCH_LOOKUP_CHUNK):
+                    chunk = ids[start:start + self.BATCH_LOOKUP_CHUNK]
+                    # One query per column rather than OR-ing them, so each can use its own index
+                    for column in ("Col3", "Col1"):
+                        query = f"""
+                            SELECT Col1, Col2, Col3, Col4, Col5, Col6, Col7
+                            FROM {table}
+                            WHERE {column} IN ({', '.join(['%s'] * len(chunk))});
+                        """
+                        with self.query_metrics.timed('execute'):
+                            cursor.execute(self.with_time_limit(query), chunk)
+                        results.description = cursor.description
+                        for row in cursor.fetchall():
+                            if (row[2], row[0]) not in seen:
+                                seen.add((row[2], row[0]))
+                                results.append(row)
+            connection.commit()
+            return results
+
+        return self.connection_pool.run(lookup)
+
+    def display_id_batch(self, search, source, results, error=None):
+        self.mark_startup('first_result')
+        if not search['cleared']:
+            self.result_table.clear_rows()
+            search['cleared'] = True
+
+        if error is not None:
+            print(f"Error querying database ({source}): {error}")
+            search['errors'] += 1
+        elif results:
+            self.add_results_to_table(results, source)
+            search['rows'] += len(results)
+            search['found'].update(str(row[0]) for row in results)
+            search['found'].update(str(row[2]) for row in results)
+
+        search['pending'] -= 1
+        if search['pending']:
+            return
 
-        query1 = """
-            SELECT Col1, Col2, Col3, Col4, Col5, Col6, Col7
-            FROM table5
-            WHERE Col4 LIKE %s;
-        """
+        if not search['rows']:
+            if search['errors']:
+                self.result_table.show_message("Error querying database. Check console for details.")
+            else:
+                self.result_table.show_message("No results found.")
+        self.set_loading_line(self.main_loading_line, False)
 
-        query2 = """
+        ids = search['ids']
+        summary = f"{search['rows']:,} results for {len(ids):,} IDs"
+        if search['errors']:
+            self.main_count_label.setText(f"{summary} · some tables could not be searched, check console for details")
+            return
+        missing = [str(value) for value in ids if str(value) not in search['found']]
+        if not missing:
+            self.main_count_label.setText(f"{summary} · all IDs found")
+            return
+        shown = ", ".join(missing[:self.MISSING_IDS_SHOWN])
+        if len(missing) > self.MISSING_IDS_SHOWN:
+            shown += f", … (+{len(missing) - self.MISSING_IDS_SHOWN:,} more, see tooltip)"
+        self.main_count_label.setText(f"{summary} · {len(missing):,} not found: {shown}")
+        self.main_count_label.setToolTip(", ".join(missing))
+
+    def fetch_main_page(self, table, condition, params, after=None):
+        # One page of a main search in key order (Col3, Col1), starting after the key of the previous page's last
+        # row. Seeking on the key instead of using OFFSET keeps every page as cheap as the first. Col3 (the package
+        # id) is assumed never to be NULL, as such rows would not compare after any key.
+        query = f"""
             SELECT Col1, Col2, Col3, Col4, Col5, Col6, Col7
-            FROM table6
-            WHERE Col4 LIKE %s;
+            FROM {table}
+            WHERE ({condition})
+        """
+        if after is not None:
+            query += " AND (Col3 > %s OR (Col3 = %s AND Col1 > %s))"
+            params = (*params, after[0], after[0], after[1])
+        query += f" ORDER BY Col3, Col1 LIMIT {self.search_settings['page_size']};"
+        return self.fetch_all(query, params)
+
+    def estimate_main_count(self, table, condition, params):
+        # The optimizer's row estimate from EXPLAIN: costs no scan, but is only a rough guide
+        query = f"""
+            EXPLAIN SELECT Col1
+            FROM {table}
+            WHERE {condition};
         """
 
+        def explain(connection):
+            with connection.cursor() as cursor:
+                with self.query_metrics.timed('execute'):
+                    cursor.execute(query, params)
+                names = [column[0].lower() for column in cursor.description]
+                rows = cursor.fetchall()
+            connection.commit()
+            estimate = 0
+            for row in rows:
+                values = dict(zip(names, row))
+                estimate += int(values.get('rows') or 0) * float(values.get('filtered') or 100) / 100
+            return int(estimate)
+
+        return self.connection_pool.run(explain)
+
+    def description_condition(self, table, search_text):
+        # FULLTEXT where it is enabled and the table has the index, otherwise the original LIKE scan
+        boolean_query = self.fulltext_query(search_text) if self.search_settings['fulltext'] else None
+        if boolean_query and table not in self.fulltext_unavailable:
+            return "MATCH(Col4) AGAINST (%s IN BOOLEAN MODE)", (boolean_query,)
+        return "Col4 LIKE %s", ('%' + search_text + '%',)
+
+    def fetch_description_matches(self, table, search_text, after=None):
+        # Local index first, then FULLTEXT, then LIKE
+        local_index = self.description_indexes.get(table)
+        if local_index is not None:
+            return local_index.page(search_text, after, self.search_settings['page_size'])
+
+        condition, params = self.description_condition(table, search_text)
         try:
-            cursor.execute(query1, ('%' + search_text + '%',))
-            results1 = cursor.fetchall()
-
-            cursor.execute(query2, ('%' + search_text + '%',))
-            results2 = cursor.fetchall()
+            return self.fetch_main_page(table, condition, params, after)
+        except self.driver.Error as e:
+            if condition.startswith("Col4 LIKE") or not e.args or e.args[0] != self.ER_FT_MATCHING_KEY_NOT_FOUND:
+                raise
+            print(f"No FULLTEXT index on {table}.Col4, falling back to LIKE")
+            self.fulltext_unavailable.add(table)
+        condition, params = self.description_condition(table, search_text)
+        return self.fetch_main_page(table, condition, params, after)
+
+    def estimate_description_matches(self, table, search_text):
+        local_index = self.description_indexes.get(table)
+        if local_index is not None:
+            return local_index.count(search_text)
+        condition, params = self.description_condition(table, search_text)
+        return self.estimate_main_count(table, condition, params)
+
+    def fulltext_query(self, search_text):
+        # Every word must be present as a word prefix; returns None when the text cannot be expressed that way
+        # (operators only, or words shorter than the server's minimum token size) so LIKE is used instead
+        words = re.sub(r'[+\-><()~*"@]', ' ', search_text).split()
+        if not words or any(len(word) < self.search_settings['fulltext_min_word'] for word in words):
+            return None
+        return " ".join(f"+{word}*" for word in words)
+
+    def refresh_description_indexes(self):
+        def build(table):
+            query = f"""
+                SELECT Col1, Col2, Col3, Col4, Col5, Col6, Col7
+                FROM {table};
+            """
+            return DescriptionIndex(self.fetch_all(query, time_limit=False))
+
+        def store(table, index):
+            self.description_indexes[table] = index
+            self.statusBar().showMessage(
+                f"Local description index for {table}: {len(index.rows):,} rows, built {index.built_at:%H:%M:%S}")
+
+        for table in ("table5", "table6"):
+            self.run_in_background(build, table,
+                                   on_result=lambda index, table=table: store(table, index),
+                                   on_error=lambda e, table=table: print(f"Could not index {table}: {e}"),
+                                   label=f"local index {table}")
+
+    def run_main_search(self, search_text, sources):
+        # sources are (source, fetch_page(after), estimate()). Every source is read a page at a time: the first
+        # pages are fetched right away, each on its own worker (and pooled connection) and rendered as soon as it
+        # returns; further pages follow as the user scrolls down. A new search cancels whatever is left of the
+        # previous one. The rows are shown in the order they arrive, not the view's sort, so each page goes below
+        # the ones already loaded.
+        request = self.start_request('main')
+        self.result_table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.main_search_base = None
+        self.main_search = search = {'text': search_text, 'request': request, 'pending': 0, 'cleared': False,
+                                     'rows': 0, 'errors': 0, 'sources': {}}
+        self.main_count_label.setText("")
+        self.main_count_label.setToolTip("")
+        for source, fetch_page, estimate in sources:
+            search['sources'][source] = {'fetch_page': fetch_page, 'after': None, 'done': False, 'loading': False,
+                                         'estimate': None}
+            self.run_in_background(
+                estimate,
+                on_result=lambda count, source=source: self.store_main_estimate(search, source, count),
+                on_error=lambda error, source=source: print(f"Could not estimate result size ({source}): {error}"),
+                request=request, label=f"main search estimate {source}")
+        self.load_main_page(search)
+
+    def load_main_page(self, search):
+        for source, state in search['sources'].items():
+            if state['done'] or state['loading']:
+                continue
+            state['loading'] = True
+            search['pending'] += 1
+            self.run_in_background(
+                state['fetch_page'], state['after'],
+                on_result=lambda results, source=source: self.display_main_source(search, source, results),
+                on_error=lambda error, source=source: self.display_main_source(search, source, None, error),
+                request=search['request'], label=f"main search {source}")
+        if search['pending']:
+            self.set_loading_line(self.main_loading_line, True)
+
+    def load_more_main_results(self):
+        search = self.main_search
+        if search is not None and not search['request'].cancelled and not search['pending']:
+            self.load_main_page(search)
+
+    def main_results_scrolled(self, value):
+        # The next page is requested while the last one is still a screen away from the bottom
+        scroll_bar = self.result_table.verticalScrollBar()
+        if value >= scroll_bar.maximum() - scroll_bar.pageStep():
+            self.load_more_main_results()
+
+    def display_main_source(self, search, source, results, error=None):
+        self.mark_startup('first_result')
+        if not search['cleared']:
+            self.result_table.clear_rows()
+            search['cleared'] = True
+
+        state = search['sources'][source]
+        state['loading'] = False
+        if error is not None:
+            print(f"Error querying database ({source}): {error}")
+            search['errors'] += 1
+            state['done'] = True
+        elif results:
+            self.add_results_to_table(results, source)
+            search['rows'] += len(results)
+            state['after'] = (results[-1][2], results[-1][0])
+            state['done'] = len(results) < self.search_settings['page_size']
+        else:
+            state['done'] = True
 
-            self.result_table.setRowCount(0)
+        search['pending'] -= 1
+        if search['pending']:
+            return
 
-            if not results1 and not results2:
-                self.result_table.setRowCount(1)
-                self.result_table.setItem(0, 0, QTableWidgetItem("No results found."))
+        complete = all(state['done'] for state in search['sources'].values())
+        if complete:
+            # Later searches that only add to this text can be answered from these rows, unless some are missing
+            search_text = search['text']
+            self.main_search_base = {
+                'text': search_text.lower(),
+                'substring': (not search['errors'] and not search_text.isdigit()
+                              and self.is_substring_search(search_text)),
+            }
+
+        if not search['rows']:
+            if search['errors']:
+                self.result_table.show_message("Error querying database. Check console for details.")
             else:
-                self.add_results_to_table(results1, "Source1")
-                self.add_results_to_table(results2, "Source2")
+                self.result_table.show_message("No results found.")
+        self.set_loading_line(self.main_loading_line, False)
+        self.update_main_count(search)
 
-            connection.commit()
-        except Exception as e:
-            print(f"Error querying database: {e}")
-            self.result_table.setRowCount(1)
-            self.result_table.setItem(0, 0, QTableWidgetItem("Error querying database. Check console for details."))
-        finally:
-            cursor.close()
-            connection.close()
+        # Keep loading while the rows do not fill the table yet, as there is nothing to scroll
+        viewport_height = self.result_table.viewport().height()
+        if not complete and self.result_table.verticalHeader().length() <= viewport_height:
+            self.load_main_page(search)
 
-        self.set_loading_line(self.main_loading_line, False)
+    def store_main_estimate(self, search, source, count):
+        search['sources'][source]['estimate'] = count
+        if search is self.main_search:
+            self.update_main_count(search)
+
+    def update_main_count(self, search):
+        if not search['cleared']:
+            return
+        loaded = search['rows']
+        states = search['sources'].values()
+        if all(state['done'] for state in states):
+            self.main_count_label.setText(f"{loaded:,} results")
+            return
+        estimates = [state['estimate'] for state in states]
+        if None in estimates:
+            self.main_count_label.setText(f"{loaded:,} loaded · scroll for more")
+        else:
+            estimate = max(sum(estimates), loaded)
+            self.main_count_label.setText(f"{loaded:,} loaded of about {estimate:,} (estimate) · scroll for more")
 
     def add_results_to_table(self, results, source):
-        for row in results:
-            row_position = self.result_table.rowCount()
-            self.result_table.insertRow(row_position)
-            self.result_table.setItem(row_position, 0, QTableWidgetItem(str(row[0])))  # CustomerID
-            type_value = 'Yes' if row[6] in [b'\x01', 1] else 'No'
-            self.result_table.setItem(row_position, 1, QTableWidgetItem(type_value))  # Type
-            self.result_table.setItem(row_position, 2, QTableWidgetItem(str(row[2])))  # PackageID
-            self.result_table.setItem(row_position, 3, QTableWidgetItem(str(row[3])))  # Description
-            self.result_table.setItem(row_position, 4, QTableWidgetItem(source))  # Source
-            distribution_value = 'Yes' if row[5] == b'\x01' else 'No'
-            self.result_table.setItem(row_position, 5, QTableWidgetItem(distribution_value))  # Distribution
-            is_active = 'Yes' if row[1] == b'\x01' else 'No'
-            self.result_table.setItem(row_position, 6, QTableWidgetItem(is_active))  # IsActive
-            self.result_table.setItem(row_position, 7, QTableWidgetItem(str(row[4])))  # ExpirationDate
+        if not results:
+            return
+        customer_id, is_active, package_id, description, expiration, distribution, package_type = \
+            self.MAIN_SCHEMA.convert_columns(results)
+        kinds = self.MAIN_SCHEMA.column_kinds(getattr(results, 'description', None))
+        self.result_table.set_column_kinds([kinds[0], kinds[6], kinds[2], kinds[3], None, kinds[5], kinds[1], kinds[4]])
+        self.result_table.append_columns([
+            customer_id,  # CustomerID
+            package_type,  # Type
+            package_id,  # PackageID
+            description,  # Description
+            [source] * len(results),  # Source
+            distribution,  # Distribution
+            is_active,  # IsActive
+            expiration,  # ExpirationDate
+        ])
 
     def filter_results(self):
-        customer_id_filter = self.customer_id_search.text()
-        is_active_filter = self.is_active_search.text().lower()
-        package_id_filter = self.package_id_search.text()
-        description_filter = self.description_search.text().lower()
-
-        for row in range(self.result_table.rowCount()):
-            customer_id_item = self.result_table.item(row, 0)
-            is_active_item = self.result_table.item(row, 1)
-            package_id_item = self.result_table.item(row, 2)
-            description_item = self.result_table.item(row, 3)
-
-            customer_id_visible = customer_id_filter in customer_id_item.text()
-            is_active_visible = is_active_filter in is_active_item.text().lower()
-            package_id_visible = package_id_filter in package_id_item.text()
-            description_visible = description_filter in description_item.text().lower()
-
-            is_row_visible = customer_id_visible and is_active_visible and package_id_visible and description_visible
-            self.result_table.setRowHidden(row, not is_row_visible)
-
-    def handle_selection_async(self, selection, infobox, package_id):
+        self.result_table.proxy_model.set_column_filters(
+            {column: filter_edit.text() for column, filter_edit in enumerate(self.result_filter_edits)})
+
+    def sync_filter_bar(self):
+        # Header filters and new results change the proxy directly; mirror that in the filter bar
+        proxy_model = self.result_table.proxy_model
+        for column, filter_edit in enumerate(self.result_filter_edits):
+            text = proxy_model.column_filter_text(column) or ""
+            if filter_edit.text().lower() != text:
+                filter_edit.blockSignals(True)
+                filter_edit.setText(text)
+                filter_edit.blockSignals(False)
+
+    def handle_selection_async(self, selection, infobox, package_id, refresh=False):
         self.set_loading_line(self.info_loading_line1 if infobox == "Infobox1" else self.info_loading_line2, True)
-        QTimer.singleShot(1000, lambda: self.query_selection_async(selection, infobox, package_id))
-
-    def query_selection_async(self, selection, infobox, package_id):
-        if selection == "Option1":
-            self.query_option1_async("table7", infobox, package_id)
-        elif selection == "Option2":
-            self.query_option2_async(infobox, package_id)
-        elif selection == "Option3":
-            self.query_option3_async(infobox, package_id)
-        elif selection == "Option4":
-            self.query_option4_async(infobox, package_id)
-        elif selection == "Option5":
-            self.query_option5_async(infobox, package_id)
-
-    def export_table_to_csv(self, table, table_name):
+        self.query_selection_async(selection, infobox, package_id, refresh)
+
+    def query_selection_async(self, selection, infobox, package_id, refresh=False):
+        self.start_request(infobox)
+        self.infobox_activity.pop(infobox, None)
+        with self.cache_bypassed(refresh):
+            if selection == "Option1":
+                self.query_option1_async("table7", infobox, package_id)
+            elif selection == "Option2":
+                self.query_option2_async(infobox, package_id)
+            elif selection == "Option3":
+                self.query_option3_async(infobox, package_id)
+            elif selection == "Option4":
+                self.query_option4_async(infobox, package_id)
+            elif selection == "Option5":
+                self.query_option5_async(infobox, package_id)
+
+    def create_export_menu(self, table, table_name):
+        # table_name is called when the export starts, so the file is named after the option selected at that time
+        menu = QMenu(self)
+        loaded_menu = menu.addMenu("Loaded rows")
+        database_menu = menu.addMenu("All rows from database")
+        for export_format, (label, _, _) in EXPORT_FORMATS.items():
+            missing_module = missing_export_module(export_format)
+            for submenu, export in ((loaded_menu, self.export_table), (database_menu, self.export_query)):
+                action = submenu.addAction(f"{label} (requires {missing_module})" if missing_module else label)
+                action.setEnabled(missing_module is None)
+                action.triggered.connect(
+                    lambda checked=False, export=export, export_format=export_format:
+                    export(table, table_name(), export_format))
+        menu.aboutToShow.connect(lambda: database_menu.setEnabled(table.source_query is not None))
+        return menu
+
+    def export_file_path(self, table_name, export_format):
+        folder_path = os.path.join(os.path.expanduser("~"), "Documents", "Ez Search")
+        os.makedirs(folder_path, exist_ok=True)
+        extension = EXPORT_FORMATS[export_format][1]
+        file_name = f"{table_name}_export_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}{extension}"
+        return os.path.join(folder_path, file_name)
+
+    def export_table(self, table, table_name, export_format='csv'):
         try:
-            folder_path = os.path.join(os.path.expanduser("~"), "Documents", "Ez Search")
-            os.makedirs(folder_path, exist_ok=True)
-            file_name = f"{table_name}_export_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.csv"
-            file_path = os.path.join(folder_path, file_name)
-
-            with open(file_path, mode='w', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                header = [table.horizontalHeaderItem(col).text() for col in range(table.columnCount())]
-                writer.writerow(header)
-                for row in range(table.rowCount()):
-                    if table.isRowHidden(row):
-                        continue  # Skip hidden rows
-                    row_data = [table.item(row, col).text() if table.item(row, col) else '' for col in
-                                range(table.columnCount())]
-                    writer.writerow(row_data)
-
-            msg = QMessageBox()
-            msg.setIcon(QMessageBox.Information)
-            msg.setText(f"Export Successful\nFile saved to: {file_path}")
-            msg.setWindowTitle("Export Status")
-            msg.setStandardButtons(QMessageBox.Ok | QMessageBox.Open)
-            if msg.exec_() == QMessageBox.Open:
-                os.startfile(folder_path)
+            file_path = self.export_file_path(table_name, export_format)
+            started = time.monotonic()
+            columns = table.header_labels()
+            source_model = table.source_model
+            flag_columns = table.source_query['flag_columns'] if table.source_query else ()
+            kinds = ['datetime' if source_model.is_date_column(column) else None for column in range(len(columns))]
+            types = export_column_types(columns, flag_columns, kinds=kinds, column_values=source_model.column_values)
+
+            row_count = 0
+            with export_writer(file_path, export_format, columns, types) as write:
+                # Only the rows that pass the current filters, in the order they are shown
+                visible_rows = table.visible_rows()
+                while True:
+                    rows = list(islice(visible_rows, self.STREAM_BATCH_SIZE))
+                    if not rows:
+                        break
+                    write(rows, rows)
+                    row_count += len(rows)
+
+            self.show_export_succeeded(file_path, row_count, time.monotonic() - started)
 
         except Exception as e:
-            print(f"Export error: {e}")
-            msg = QMessageBox()
-            msg.setIcon(QMessageBox.Critical)
-            msg.setText(f"Export Failed\nError: {str(e)}")
-            msg.setWindowTitle("Export Status")
-            msg.exec_()
+            self.show_export_failed(e)
 
-    def query_option1_async(self, subscription_table, infobox, package_id):
+    def export_query(self, table, table_name, export_format='csv'):
+        # Re-runs the query behind the table and streams every matching row to disk on a worker thread, so the
+        # export is not limited to the loaded rows and never holds the result in memory
         try:
-            connection = pymysql.connect(**self.connection_config)
-            cursor = connection.cursor()
-
-            if subscription_table == "table7":
-                query = f"""
-                    SELECT x.Col1 as Col1, x.Col2, x.Col3, x.Col4, x.Col5, x.Col6
-                    FROM {subscription_table} x
-                    JOIN table2 f ON x.Col1 = f.Col1
-                    WHERE x.Col3 = %s AND f.Col3 > NOW() - INTERVAL 14 DAY;
-                """
-                columns = ["Col1", "Col2", "Col3", "Col4", "Col5", "Col6"]
+            file_path = self.export_file_path(table_name, export_format)
+        except OSError as e:
+            self.show_export_failed(e)
+            return
+        query, params, row_filter = self.build_export_query(table)
+        request = QueryRequest()
+        self.active_exports.add(request)
+        started = time.monotonic()
+
+        progress = QProgressDialog(f"Exporting {table_name}...", "Cancel", 0, 0, self)
+        progress.setWindowTitle("Export")
+        progress.setMinimumDuration(0)
+        progress.canceled.connect(lambda: self.cancel_request(request))
+        progress.show()
+
+        def on_progress(row_count):
+            elapsed = max(time.monotonic() - started, 1e-6)
+            progress.setLabelText(f"{row_count:,} rows written · {row_count / elapsed:,.0f} rows/s")
+
+        def finish():
+            self.active_exports.discard(request)
+            progress.close()
+            progress.deleteLater()
+
+        def on_done(row_count):
+            finish()
+            if row_count is None:
+                self.statusBar().showMessage("Export cancelled", 5000)
             else:
-                query = f"""
-                    SELECT x.Col1 as Col1, x.Col5
-                    FROM {subscription_table} x
-                    JOIN table2 f ON x.Col1 = f.Col1
-                    WHERE x.Col3 = %s AND f.Col3 > NOW() - INTERVAL 14 DAY;
-                """
-                columns = ["Col1", "Col5"]
-
-            cursor.execute(query, (package_id,))
-            filtered_results = cursor.fetchall()
-
-            connection.commit()
+                self.show_export_succeeded(file_path, row_count, time.monotonic() - started)
 
-        except pymysql.MySQLError as e:
-            filtered_results = []
-        except Exception as e:
-            filtered_results = []
+        def on_error(error):
+            finish()
+            if request.cancelled:
+                # The kill that stopped the statement surfaces as an error
+                self.statusBar().showMessage("Export cancelled", 5000)
+            else:
+                self.show_export_failed(error)
+
+        source = table.source_query
+        self.run_in_background(self.stream_export, file_path, export_format, query, params, table.header_labels(),
+                               source['convert_rows'], source['flag_columns'], row_filter, request,
+                               on_result=on_done, on_error=on_error, on_progress=on_progress,
+                               label=f"export {table_name}")
+
+    def build_export_query(self, table):
+        # Pushes the table's header filters and sort order into SQL around the original query. Columns whose shown
+        # value differs from the stored one are left to the row filter, which also re-checks every pushed-down
+        # filter after conversion, so the file holds exactly the rows the table would show.
+        source = table.source_query
+        columns = table.header_labels()
+        proxy_model = table.proxy_model
+        text_filters = proxy_model.text_filters()
+        date_ranges = proxy_model.date_ranges()
+
+        def sql_column(column):
+            name = columns[column]
+            return None if name in source['flag_columns'] else f"export.`{name}`"
+
+        conditions = []
+        params = list(source['params'])
+        for column, text in text_filters.items():
+            name = sql_column(column)
+            if name:
+                # NULL is shown as text in the table, so it has to reach the row filter
+                conditions.append(f"({name} LIKE %s OR {name} IS NULL)")
+                escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                params.append(f"%{escaped}%")
+        for column, (start, end) in date_ranges.items():
+            name = sql_column(column)
+            if name and start is not None:
+                conditions.append(f"{name} >= %s")
+                params.append(EPOCH + timedelta(seconds=start))
+            if name and end is not None:
+                conditions.append(f"{name} <= %s")
+                params.append(EPOCH + timedelta(seconds=end))
+
+        order_by = None
+        sort_key = proxy_model.sort_key()
+        if sort_key and sql_column(sort_key[0]):
+            order_by = f"{sql_column(sort_key[0])} {'DESC' if sort_key[1] == Qt.DescendingOrder else 'ASC'}"
+
+        query = source['query']
+        if conditions or order_by:
+            query = f"SELECT * FROM ({query}) AS export"
+            if conditions:
+                query += f" WHERE {' AND '.join(conditions)}"
+            if order_by:
+                query += f" ORDER BY {order_by}"
+        return query, params, self.export_row_filter(text_filters, date_ranges)
+
+    @staticmethod
+    def export_row_filter(text_filters, date_ranges):
+        # Same checks as the table's proxy, applied to converted rows
+        if not (text_filters or date_ranges):
+            return None
+
+        def matches(row):
+            for column, text in text_filters.items():
+                if text not in str(row[column]).lower():
+                    return False
+            for column, (start, end) in date_ranges.items():
+                timestamp = to_timestamp(row[column])
+                if (timestamp == MISSING_TIMESTAMP or (start is not None and timestamp < start)
+                        or (end is not None and timestamp > end)):
+                    return False
+            return True
+
+        return matches
+
+    def stream_export(self, file_path, export_format, query, params, columns, convert_rows, flag_columns, row_filter,
+                      request, progress_callback=None):
+        # Runs on a worker thread. Rows go from an unbuffered cursor to the file one batch at a time, and the file
+        # is written under a temporary name that is only renamed once every row is in it. Exports use their own
+        # connection without the interactive query timeouts, and leave the pool to the interactive queries.
+        partial_path = file_path + ".part"
+        row_count = 0
+        completed = False
+        metrics = self.query_metrics
+        with metrics.timed('connect'):
+            connection = self.driver.connect(**self.connection_config)
+        try:
+            request.attach(connection)
+            cursor = connection.cursor(self.driver.streaming_cursor)
+            with metrics.timed('execute'):
+                cursor.execute(query, params)
+            types = export_column_types(columns, flag_columns, cursor.description)
+            with export_writer(partial_path, export_format, columns, types) as write:
+                while not request.cancelled:
+                    with metrics.timed('fetch'):
+                        rows = cursor.fetchmany(self.STREAM_BATCH_SIZE)
+                    if not rows:
+                        completed = True
+                        break
+                    metrics.count_rows(rows)
+                    display_rows = convert_rows(rows, cursor.description) if convert_rows else rows
+                    if row_filter:
+                        kept = [position for position, row in enumerate(display_rows) if row_filter(row)]
+                        rows = [rows[position] for position in kept]
+                        display_rows = [display_rows[position] for position in kept]
+                    write(display_rows, rows)
+                    row_count += len(rows)
+                    progress_callback(row_count)
+            if completed:
+                cursor.close()
+                connection.commit()
         finally:
-            cursor.close()
+            # Closing the connection is also the only way to abandon an unbuffered result that was not read to the end
+            request.detach(connection)
             connection.close()
+            if not completed and os.path.exists(partial_path):
+                os.remove(partial_path)
+        if not completed:
+            return None
+        os.replace(partial_path, file_path)
+        return row_count
+
+    def show_export_succeeded(self, file_path, row_count, elapsed):
+        elapsed = max(elapsed, 1e-6)
+        size_mb = os.path.getsize(file_path) / (1024 * 1024)
+        msg = QMessageBox()
+        msg.setIcon(QMessageBox.Information)
+        msg.setText(f"Export Successful\nFile saved to: {file_path}\n"
+                    f"{row_count:,} rows · {size_mb:,.1f} MB in {elapsed:.1f}s ({row_count / elapsed:,.0f} rows/s)")
+        msg.setWindowTitle("Export Status")
+        msg.setStandardButtons(QMessageBox.Ok | QMessageBox.Open)
+        if msg.exec_() == QMessageBox.Open:
+            os.startfile(os.path.dirname(file_path))
+
+    def show_export_failed(self, error):
+        print(f"Export error: {error}")
+        msg = QMessageBox()
+        msg.setIcon(QMessageBox.Critical)
+        msg.setText(f"Export Failed\nError: {str(error)}")
+        msg.setWindowTitle("Export Status")
+        msg.exec_()
+
+    def option1_query(self, subscription_table):
+        if subscription_table == "table7":
+            query = f"""
+                SELECT x.Col1 as Col1, x.Col2, x.Col3, x.Col4, x.Col5, x.Col6
+                FROM {subscription_table} x
+                JOIN table2 f ON x.Col1 = f.Col1
+                WHERE x.Col3 = %s AND f.Col3 > NOW() - INTERVAL 14 DAY;
+            """
+            schema = ResultSchema([("Col1", 'int', self.NO_DATA), ("Col2", 'flag'), ("Col3", 'int', self.NO_DATA),
+                                   ("Col4", 'text', self.NO_DATA), ("Col5", 'datetime', self.NO_DATA),
+                                   ("Col6", 'flag')])
+        else:
+            query = f"""
+                SELECT x.Col1 as Col1, x.Col5
+                FROM {subscription_table} x
+                JOIN table2 f ON x.Col1 = f.Col1
+                WHERE x.Col3 = %s AND f.Col3 > NOW() - INTERVAL 14 DAY;
+            """
+            schema = ResultSchema([("Col1", 'int', self.NO_DATA), ("Col5", 'datetime', self.NO_DATA)])
+        return query, schema
 
-        if not filtered_results:
-            filtered_results = [(None,)] * len(columns)
-            filtered_results[0] = (f"No data available within the last 14 days",)
-
-        self.display_results_in_infobox(filtered_results, infobox, columns)
+    def query_option1_async(self, subscription_table, infobox, package_id):
+        query, schema = self.option1_query(subscription_table)
 
-    def query_option2_async(self, infobox, package_id):
-        try:
-            connection = pymysql.connect(**self.connection_config)
-            cursor = connection.cursor()
-
-            # Query table8
-            query_prematch = """
-                SELECT Col1, Col5
-                FROM table8
-                WHERE Col3 = %s;
-            """
-            cursor.execute(query_prematch, (package_id,))
-            prematch_results = cursor.fetchall()
+        def display(filtered_results):
+            self.display_results_in_infobox(filtered_results, infobox, schema,
+                                            "No data available within the last 14 days")
 
-            # Query table9
-            query_subscriptions = """
-                SELECT Col2, Col3, Col4, Col5
-                FROM table9
-                WHERE Col3 = %s;
-            """
-            cursor.execute(query_subscriptions, (package_id,))
-            subscriptions_results = cursor.fetchall()
-
-            combined_results = []
-
-            # Add table8 results with level "Fixture"
-            for row in prematch_results:
-                combined_results.append((*row, 'Fixture'))
-
-            # Add fixtures from table9 with appropriate level
-            for row in subscriptions_results:
-                col2, col3, col4, col5 = row
-
-                if col4:
-                    query_fixtures = """
-                        SELECT Col1, Col5
-                        FROM table2
-                        WHERE Col4 = %s AND Col5 > NOW() - INTERVAL 5 DAY AND Col6 NOT IN (10, 7, 4);
-                    """
-                    cursor.execute(query_fixtures, (col4,))
-                    fixtures = cursor.fetchall()
-                    for fixture in fixtures:
-                        fixture_id, start_date = fixture
-                        combined_results.append((fixture_id, max(start_date, col5), 'League'))
-
-                elif col3:
-                    query_fixtures = """
-                        SELECT Col1, Col5
-                        FROM table2
-                        WHERE Col3 = %s AND Col2 = %s AND Col5 > NOW() - INTERVAL 5 DAY AND Col6 NOT IN (10, 7, 4);
-                    """
-                    cursor.execute(query_fixtures, (col3, col2))
-                    fixtures = cursor.fetchall()
-                    for fixture in fixtures:
-                        fixture_id, start_date = fixture
-                        combined_results.append((fixture_id, max(start_date, col5), 'Location'))
-
-                elif col2:
-                    query_fixtures = """
-                        SELECT Col1, Col5
-                        FROM table2
-                        WHERE Col2 = %s AND Col5 > NOW() - INTERVAL 5 DAY AND Col6 NOT IN (10, 7, 4);
-                    """
-                    cursor.execute(query_fixtures, (col2,))
-                    fixtures = cursor.fetchall()
-                    for fixture in fixtures:
-                        fixture_id, start_date = fixture
-                        combined_results.append((fixture_id, max(start_date, col5), 'Sport'))
+        self.set_infobox_source_query(infobox, query, (package_id,), schema)
+        self.run_in_background(self.fetch_all, query, (package_id,), on_result=display,
+                               on_error=lambda e: display([]),
+                               cache_key=(query, (package_id,)), cache_ttl=self.cache_ttls['activity'],
+                               request=self.panel_requests[infobox])
 
-            connection.commit()
+    def query_option2_async(self, infobox, package_id):
+        def display(combined_results):
+            self.display_results_in_infobox(combined_results, infobox, self.OPTION2_SCHEMA, self.NO_DATA)
 
-        except pymysql.MySQLError as e:
-            print(f"MySQL error: {e}")
-            combined_results = []
-        except Exception as e:
-            print(f"Exception: {e}")
-            combined_results = []
-        finally:
-            cursor.close()
-            connection.close()
+        def on_error(e):
+            if isinstance(e, self.driver.Error):
+                print(f"MySQL error: {e}")
+            else:
+                print(f"Exception: {e}")
+            display([])
 
-        if not combined_results:
-            combined_results = [(None, None, "No data available")]
+        # Option2 is assembled in Python from several queries, so only the loaded rows can be exported
+        self.set_infobox_source_query(infobox, None)
+        self.run_in_background(self.fetch_option2, package_id, on_result=display, on_error=on_error,
+                               cache_key=("option2", package_id), cache_ttl=self.cache_ttls['fixtures'],
+                               request=self.panel_requests[infobox])
 
-        self.display_results_in_infobox(combined_results, infobox, ["Col1", "Col5", "Level"])
+    def fetch_option2(self, package_id):
+        return self.connection_pool.run(lambda connection: self.collect_option2_results(connection, package_id))
 
-    def query_option3_async(self, infobox, package_id):
-        try:
-            connection = pymysql.connect(**self.connection_config)
-            cursor = connection.cursor()
+    def collect_option2_results(self, connection, package_id):
+        cursor = connection.cursor()
 
-            query = """
+        # Query table8
+        query_prematch = """
+            SELECT Col1, Col5
+            FROM table8
+            WHERE Col3 = %s;
+        """
+        timed = self.query_metrics.timed
+        with timed('execute'):
+            cursor.execute(self.with_time_limit(query_prematch), (package_id,))
+        prematch_results = cursor.fetchall()
+
+        # Query table9
+        query_subscriptions = """
+            SELECT Col2, Col3, Col4, Col5
+            FROM table9
+            WHERE Col3 = %s;
+        """
+        with timed('execute'):
+            cursor.execute(self.with_time_limit(query_subscriptions), (package_id,))
+        subscriptions_results = cursor.fetchall()
+
+        combined_results = []
+
+        # Add table8 results with level "Fixture"
+        for row in prematch_results:
+            combined_results.append((*row, 'Fixture'))
+
+        # Add fixtures from table9 with appropriate level. The fixtures for every subscription of a level are
+        # fetched together instead of one query per subscription row.
+        leagues, locations, sports = set(), set(), set()
+        for col2, col3, col4, col5 in subscriptions_results:
+            if col4:
+                leagues.add(col4)
+            elif col3:
+                locations.add((col3, col2))
+            elif col2:
+                sports.add(col2)
+
+        league_fixtures = self.fetch_fixtures_by(cursor, ("Col4",), leagues)
+        location_fixtures = self.fetch_fixtures_by(cursor, ("Col3", "Col2"), locations)
+        sport_fixtures = self.fetch_fixtures_by(cursor, ("Col2",), sports)
+
+        for col2, col3, col4, col5 in subscriptions_results:
+            if col4:
+                level, fixtures = 'League', league_fixtures.get(col4, ())
+            elif col3:
+                level, fixtures = 'Location', location_fixtures.get((col3, col2), ())
+            elif col2:
+                level, fixtures = 'Sport', sport_fixtures.get(col2, ())
+            else:
+                continue
+            for fixture_id, start_date in fixtures:
+                combined_results.append((fixture_id, max(start_date, col5), level))
+
+        cursor.close()
+        connection.commit()
+        return combined_results
+
+    def fetch_fixtures_by(self, cursor, key_columns, keys):
+        # Returns {key: [(Col1, Col5), ...]} for upcoming table2 fixtures matching any of the keys
+        fixtures = {}
+        keys = list(keys)
+        key_width = len(key_columns)
+        key_expression = key_columns[0] if key_width == 1 else f"({', '.join(key_columns)})"
+        placeholder = "%s" if key_width == 1 else f"({', '.join(['%s'] * key_width)})"
+
+        for start in range(0, len(keys), self.FIXTURE_LOOKUP_CHUNK):
+            chunk = keys[start:start + self.FIXTURE_LOOKUP_CHUNK]
+            params = chunk if key_width == 1 else [value for key in chunk for value in key]
+            query_fixtures = f"""
+                SELECT {', '.join(key_columns)}, Col1, Col5
+                FROM table2
+                WHERE {key_expression} IN ({', '.join([placeholder] * len(chunk))})
+                AND Col5 > NOW() - INTERVAL 5 DAY AND Col6 NOT IN (10, 7, 4);
+            """
+            with self.query_metrics.timed('execute'):
+                cursor.execute(self.with_time_limit(query_fixtures), params)
+            for row in cursor.fetchall():
+                key = row[0] if key_width == 1 else tuple(row[:key_width])
+                fixtures.setdefault(key, []).append(row[key_width:])
+        return fixtures
+
+    def query_recent_activity(self, query, schema, infobox, package_id):
+        def display(filtered_results, watch=True):
+            self.display_results_in_infobox(filtered_results, infobox, schema,
+                                            f"No data available within the last {self.ACTIVITY_DAYS} days")
+            if watch:
+                self.watch_recent_activity(infobox, query, schema, package_id, filtered_results)
+
+        self.set_infobox_source_query(infobox, query, (package_id,), schema)
+        self.run_in_background(self.fetch_all, query, (package_id,), on_result=display,
+                               on_error=lambda e: display([], watch=False),
+                               cache_key=(query, (package_id,)), cache_ttl=self.cache_ttls['activity'],
+                               request=self.panel_requests[infobox])
+
+    def recent_activity_query(self, selection):
+        if selection == "Option3":
+            query = f"""
                 SELECT Col1, Col2, Col5
                 FROM table10
-                WHERE Col3 = %s AND Col5 >= NOW() - INTERVAL 14 DAY;
+                WHERE Col3 = %s AND Col5 >= NOW() - INTERVAL {self.ACTIVITY_DAYS} DAY;
             """
-            columns = ["Col1", "Col2", "Col5"]
-
-            cursor.execute(query, (package_id,))
-            filtered_results = cursor.fetchall()
-
-            connection.commit()
-
-        except pymysql.MySQLError as e:
-            filtered_results = []
-        except Exception as e:
-            filtered_results = []
-        finally:
-            cursor.close()
-            connection.close()
-
-        if not filtered_results:
-            filtered_results = [(None, None, None)]
-            filtered_results[0] = ("No data available within the last 14 days",)
-
-        self.display_results_in_infobox(filtered_results, infobox, columns)
-
-    def query_option4_async(self, infobox, package_id):
-        try:
-            connection = pymysql.connect(**self.connection_config)
-            cursor = connection.cursor()
-
-            query = """
+            schema = ResultSchema([("Col1", 'int', self.NO_DATA), ("Col2", 'int', self.NO_DATA),
+                                   ("Col5", 'datetime', self.NO_DATA)])
+        elif selection == "Option4":
+            query = f"""
                 SELECT Col2, Col3, Col4, Col5, Col6
                 FROM table9
-                WHERE Col3 = %s AND Col5 >= NOW() - INTERVAL 14 DAY;
+                WHERE Col3 = %s AND Col5 >= NOW() - INTERVAL {self.ACTIVITY_DAYS} DAY;
             """
-            columns = ["Col2", "Col3", "Col4", "Col5", "Col6"]
-
-            cursor.execute(query, (package_id,))
-            filtered_results = cursor.fetchall()
-
-            connection.commit()
-
-        except pymysql.MySQLError as e:
-            filtered_results = []
-        except Exception as e:
-            filtered_results = []
-        finally:
-            cursor.close()
-            connection.close()
-
-        if not filtered_results:
-            filtered_results = [(None, None, None, None, None)]
-            filtered_results[0] = ("No data available within the last 14 days",)
-
-        self.display_results_in_infobox(filtered_results, infobox, columns)
-
-    def query_option5_async(self, infobox, package_id):
-        try:
-            connection = pymysql.connect(**self.connection_config)
-            cursor = connection.cursor()
-
-            query = """
+            schema = ResultSchema([("Col2", 'int', self.NO_DATA), ("Col3", 'int', self.NO_DATA),
+                                   ("Col4", 'int', self.NO_DATA), ("Col5", 'datetime', self.NO_DATA),
+                                   ("Col6", 'flag')])
+        else:
+            query = f"""
                 SELECT Col1, Col2, Col3, Col4, Col5
                 FROM table11
-                WHERE Col3 = %s AND Col5 >= NOW() - INTERVAL 14 DAY;
+                WHERE Col3 = %s AND Col5 >= NOW() - INTERVAL {self.ACTIVITY_DAYS} DAY;
             """
-            columns = ["Col1", "Col2", "Col3", "Col4", "Col5"]
-
-            cursor.execute(query, (package_id,))
-            filtered_results = cursor.fetchall()
+            schema = ResultSchema([("Col1", 'int', self.NO_DATA), ("Col2", 'flag'), ("Col3", 'int', self.NO_DATA),
+                                   ("Col4", 'text', self.NO_DATA), ("Col5", 'datetime', self.NO_DATA)])
+        return query, schema
+
+    def watch_recent_activity(self, infobox, query, schema, package_id, results):
+        # Remembers what the infobox shows, so a live refresh only has to fetch the rows from the newest one on.
+        # Rows sharing that newest Col5 are remembered too, to tell them apart from rows added in the same second.
+        column = schema.names.index("Col5")
+        last_seen = max((row[column] for row in results if row[column] is not None), default=None)
+        self.infobox_activity[infobox] = {
+            'query': query,
+            'schema': schema,
+            'package_id': package_id,
+            'column': column,
+            'last_seen': last_seen,
+            'seen_at_last': {tuple(row) for row in results if last_seen is not None and row[column] == last_seen},
+            'rows': len(results),
+            'polling': False,
+        }
 
+    def live_refresh_toggled(self, infobox, checked):
+        if any(check.isChecked() for check in self.live_checks.values()):
+            self.live_timer.start()
+        else:
+            self.live_timer.stop()
+        if checked:
+            self.refresh_live_infoboxes()
+
+    def refresh_live_infoboxes(self):
+        for infobox, state in self.infobox_activity.items():
+            if state['polling'] or not self.live_checks[infobox].isChecked():
+                continue
+            state['polling'] = True
+            self.run_in_background(
+                self.fetch_activity_delta, state['query'], state['package_id'], state['last_seen'],
+                on_result=lambda delta, infobox=infobox, state=state: self.patch_recent_activity(infobox, state, delta),
+                on_error=lambda e, infobox=infobox, state=state: self.live_refresh_failed(infobox, state, e),
+                label=f"live refresh {infobox}")
+
+    def fetch_activity_delta(self, query, package_id, last_seen):
+        # Runs on a worker thread. Returns the start of the activity window by the server's clock, and the rows
+        # from last_seen on (the whole window while nothing has been seen)
+        metrics = self.query_metrics
+        params = (package_id,)
+        if last_seen is not None:
+            query = query.strip().rstrip(';') + " AND Col5 >= %s"
+            params = (package_id, last_seen)
+
+        def execute(connection):
+            with connection.cursor() as cursor:
+                cursor.execute(f"SELECT NOW() - INTERVAL {self.ACTIVITY_DAYS} DAY")
+                window_start = cursor.fetchall()[0][0]
+                with metrics.timed('execute'):
+                    cursor.execute(self.with_time_limit(query), params)
+                with metrics.timed('fetch'):
+                    results = ResultRows(cursor.fetchall(), cursor.description)
             connection.commit()
+            metrics.count_rows(results)
+            return window_start, results
+
+        return self.connection_pool.run(execute)
+
+    def patch_recent_activity(self, infobox, state, delta):
+        # New rows are appended and expired ones removed in place, so the table keeps its sort order, filters,
+        # selection and scroll position
+        state['polling'] = False
+        if self.infobox_activity.get(infobox) is not state:
+            return  # searched again in the meantime
+        window_start, results = delta
+        schema, column = state['schema'], state['column']
+        info_table = self.info_table1 if infobox == "Infobox1" else self.info_table2
 
-        except pymysql.MySQLError as e:
-            filtered_results = []
-        except Exception as e:
-            filtered_results = []
-        finally:
-            cursor.close()
-            connection.close()
+        new_rows = ResultRows([row for row in results if tuple(row) not in state['seen_at_last']],
+                              results.description)
+        if new_rows:
+            if state['rows']:
+                info_table.append_schema_results(schema, new_rows)
+            else:
+                info_table.set_schema_results(schema, new_rows)
+            state['rows'] += len(new_rows)
+            newest = max(row[column] for row in new_rows)
+            if newest != state['last_seen']:
+                state['last_seen'] = newest
+                state['seen_at_last'] = set()
+            state['seen_at_last'].update(tuple(row) for row in new_rows if row[column] == newest)
+
+        expired = []
+        if state['rows']:
+            window_timestamp = to_timestamp(window_start)
+            expired = [row for row, timestamp in enumerate(info_table.source_model.timestamps(column))
+                       if timestamp < window_timestamp]
+            if expired:
+                info_table.remove_rows(expired)
+                state['rows'] -= len(expired)
+                if not state['rows']:
+                    info_table.show_message(f"No data available within the last {self.ACTIVITY_DAYS} days")
+
+        if new_rows or expired:
+            # The cached result of the full query no longer matches the table
+            self.query_cache.discard((state['query'], (state['package_id'],)))
+        self.live_checks[infobox].setToolTip(
+            f"Refreshed {datetime.now():%H:%M:%S}: {len(new_rows)} new, {len(expired)} expired, "
+            f"{state['rows']} shown")
+
+    def live_refresh_failed(self, infobox, state, error):
+        state['polling'] = False
+        print(f"Live refresh of {infobox} failed: {error}")
 
-        if not filtered_results:
-            filtered_results = [(None, None, None, None, None)]
-            filtered_results[0] = ("No data available within the last 14 days",)
+    def query_option3_async(self, infobox, package_id):
+        query, schema = self.recent_activity_query("Option3")
+        self.query_recent_activity(query, schema, infobox, package_id)
+
+    def query_option4_async(self, infobox, package_id):
+        query, schema = self.recent_activity_query("Option4")
+        self.query_recent_activity(query, schema, infobox, package_id)
+
+    def query_option5_async(self, infobox, package_id):
+        query, schema = self.recent_activity_query("Option5")
+        self.query_recent_activity(query, schema, infobox, package_id)
+
+    def infobox_fetch(self, selection, package_id):
+        # (fn, args, cache_key, cache_ttl) loading an infobox option; the same key as the option's search above,
+        # so a prefetched result is what the search finds in the cache
+        if selection == "Option2":
+            return self.fetch_option2, (package_id,), ("option2", package_id), self.cache_ttls['fixtures']
+        if selection == "Option1":
+            query = self.option1_query("table7")[0]
+        else:
+            query = self.recent_activity_query(selection)[0]
+        return self.fetch_all, (query, (package_id,)), (query, (package_id,)), self.cache_ttls['activity']
 
-        self.display_results_in_infobox(filtered_results, infobox, columns)
+    def schedule_prefetch(self, package_id):
+        if not self.prefetch_settings['enabled'] or package_id in (None, ""):
+            return
+        self.prefetch_package_id = str(package_id)
+        self.prefetch_timer.start()
+
+    def prefetch_infoboxes(self):
+        # Loads the option selected in each infobox for the row the user is on, so clicking Search is answered
+        # from the cache
+        package_id = self.prefetch_package_id
+        wanted = {}
+        for combo_box in (self.combo_box_info3, self.combo_box_info4):
+            fn, args, cache_key, cache_ttl = self.infobox_fetch(combo_box.currentText(), package_id)
+            wanted[cache_key] = (cache_key, fn, args, cache_ttl)
+
+        # The user has moved on: drop what is queued and stop what no search is waiting for
+        self.prefetch_queue.clear()
+        for cache_key, prefetch in self.prefetches.items():
+            if cache_key not in wanted and not prefetch['waiters'] and not prefetch['request'].cancelled:
+                self.cancel_request(prefetch['request'])
+
+        for cache_key, entry in wanted.items():
+            prefetch = self.prefetches.get(cache_key)
+            if self.query_cache.contains(cache_key) or (prefetch is not None and not prefetch['request'].cancelled):
+                continue
+            self.prefetch_queue.append(entry)
+        self.run_next_prefetch()
+
+    def run_next_prefetch(self):
+        while self.prefetch_queue and self.prefetch_running < self.prefetch_settings['max_concurrent']:
+            self.start_prefetch(*self.prefetch_queue.popleft())
+
+    def start_prefetch(self, cache_key, fn, args, cache_ttl):
+        if self.query_cache.contains(cache_key):
+            return  # a search has loaded it while the prefetch was queued
+        request = QueryRequest()
+        # waiters: (on_result, on_error) of searches that joined
+        prefetch = {'request': request, 'waiters': [], 'finished': False}
+
+        def fetch():
+            if request.cancelled:
+                raise QueryCancelled()
+            with self.connection_pool.tracking(request):
+                return fn(*args)
+
+        def finish(value, failed):
+            self.prefetch_running -= 1
+            prefetch['finished'] = True
+            if self.prefetches.get(cache_key) is prefetch:
+                del self.prefetches[cache_key]
+            for on_result, on_error in prefetch['waiters']:
+                callback = on_error if failed else on_result
+                if callback:
+                    callback(value)
+            self.run_next_prefetch()
+
+        self.prefetch_running += 1
+        self.run_in_background(fetch, on_result=lambda value: finish(value, False),
+                               on_error=lambda error: finish(error, True),
+                               cache_key=cache_key, cache_ttl=cache_ttl, label=f"prefetch {self.task_label(fn, args)}")
+        # Registered after dispatch, so the prefetch does not find itself in run_in_background; unless it has
+        # already finished there, answered from the cache, and nothing would ever remove the entry
+        if not prefetch['finished']:
+            self.prefetches[cache_key] = prefetch
+
+    def set_infobox_source_query(self, infobox, query, params=None, schema=None):
+        info_table = self.info_table1 if infobox == "Infobox1" else self.info_table2
+        if query is None:
+            info_table.set_source_query(None)
+            return
+        info_table.set_source_query(query, params, schema.convert_rows, schema.flag_columns())
 
-    def display_results_in_infobox(self, results, infobox, columns):
+    def display_results_in_infobox(self, results, infobox, schema, empty_message):
         info_table = self.info_table1 if infobox == "Infobox1" else self.info_table2
-        info_table.setRowCount(0)
-        info_table.setColumnCount(len(columns))
-        info_table.setHorizontalHeaderLabels(columns)
-
-        for row in results:
-            row_position = info_table.rowCount()
-            info_table.insertRow(row_position)
-            for col_idx, col_val in enumerate(row):
-                if columns[col_idx] in ["Col2", "Col3", "Col6"]:
-                    col_val = "Yes" if col_val == b'\x01' else "No"
-                info_table.setItem(row_position, col_idx,
-                                   QTableWidgetItem(str(col_val) if col_val is not None else "No data available"))
+        if results:
+            info_table.set_schema_results(schema, results)
+        else:
+            info_table.set_columns(schema.names)
+            info_table.show_message(empty_message)
 
         self.set_loading_line(self.info_loading_line1 if infobox == "Infobox1" else self.info_loading_line2, False)
 
@@ -907,6 +3720,31 @@ class MainWindow(QMainWindow):
         else:
             line_label.setStyleSheet("background-color: green;")
 
+    def closeEvent(self, event):
+        # Queued work is dropped and running statements are killed before waiting for the workers. Workers that
+        # are still busy afterwards (e.g. connecting to an unreachable server) are cut off from the window, which
+        # is destroyed before they finish.
+        self.prefetch_queue.clear()
+        self.thread_pool.clear()
+        requests = [prefetch['request'] for prefetch in self.prefetches.values()]
+        for request in list(self.active_exports) + list(self.panel_requests.values()) + requests:
+            self.cancel_request(request)
+        self.kill_pool.waitForDone(1000)
+        self.thread_pool.waitForDone(2000)
+        for signals in self.active_workers:
+            for signal in (signals.result, signals.error, signals.progress, signals.finished):
+                try:
+                    signal.disconnect()
+                except TypeError:
+                    pass  # nothing connected
+        if self.kill_connection is not None:
+            try:
+                self.kill_connection.close()
+            except Exception:
+                pass
+        self.connection_pool.close_all()
+        super().closeEvent(event)
+
     def set_light_mode(self):
         app.setStyle('Fusion')
         palette = QPalette()
@@ -944,10 +3782,81 @@ class MainWindow(QMainWindow):
         app.setPalette(palette)
 
 
+def compare_drivers(argv):
+    # Fetch throughput of every installed driver, cursor type and compression setting against the configured
+    # server, to help choose the [connection] settings
+    parser = argparse.ArgumentParser(
+        prog="main.py --compare-drivers",
+        description="Times fetching the same rows with every installed driver, cursor type and compression setting "
+                    "against the server in config.ini.")
+    parser.add_argument('--table', default='table5', help="table the rows are read from (default: table5)")
+    parser.add_argument('--rows', type=int, default=100000, help="rows fetched per run (default: 100000)")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per configuration, the fastest counts (default: 3)")
+    args = parser.parse_args(argv)
+
+    config = read_config()
+    configured_driver, connection_config = database_connection(config)
+    settings = dict(config['connection']) if 'connection' in config else {}
+    server_config = {key: connection_config[key] for key in ('host', 'user', 'password', 'database', 'port')}
+
+    def bytes_sent(connection):
+        # The server's count of bytes sent to this session, after compression
+        with connection.cursor() as cursor:
+            cursor.execute("SHOW SESSION STATUS LIKE 'Bytes_sent'")
+            return int(cursor.fetchall()[0][1])
+
+    print(f"Fetching {args.rows:,} rows of {args.table} from {server_config['host']}, fastest of {args.repeat} runs")
+    print(f"{'driver':<22} {'cursor':<11} {'compress':<9} {'connect ms':>10} {'fetch s':>8} {'rows/s':>10} "
+          f"{'MB sent':>8} {'MB/s':>7}")
+    for name in DatabaseDriver.available():
+        driver = DatabaseDriver(name)
+        for compress in (False, True) if driver.supports_compress else (False,):
+            for cursor_type in driver.cursor_classes:
+                configured = (name == configured_driver.name
+                              and cursor_type == settings.get('cursor', 'buffered').strip().lower()
+                              and compress == connection_config.get('compress', False))
+                label = (f"{name} {driver.version}{' *' if configured else ''}"[:22].ljust(22) +
+                         f" {cursor_type:<11} {'yes' if compress else 'no':<9}")
+                run_settings = dict(settings, cursor=cursor_type, compress='true' if compress else 'false')
+                try:
+                    started = time.perf_counter()
+                    connection = driver.connect(**server_config, **driver.options(run_settings))
+                    connect_time = time.perf_counter() - started
+                    try:
+                        fastest = None
+                        for _ in range(max(args.repeat, 1)):
+                            sent = bytes_sent(connection)
+                            started = time.perf_counter()
+                            row_count = 0
+                            with connection.cursor() as cursor:
+                                cursor.execute(f"SELECT * FROM {args.table} LIMIT %s", (args.rows,))
+                                while True:
+                                    rows = cursor.fetchmany(MainWindow.STREAM_BATCH_SIZE)
+                                    if not rows:
+                                        break
+                                    row_count += len(rows)
+                            elapsed = time.perf_counter() - started
+                            sent = bytes_sent(connection) - sent
+                            if fastest is None or elapsed < fastest[0]:
+                                fastest = (elapsed, row_count, sent)
+                    finally:
+                        connection.close()
+                except driver.Error as e:
+                    print(f"{label} failed: {e}")
+                    continue
+                elapsed, row_count, sent = fastest
+                print(f"{label} {connect_time * 1000:>10.1f} {elapsed:>8.3f} {row_count / elapsed:>10,.0f} "
+                      f"{sent / 1048576:>8.1f} {sent / 1048576 / elapsed:>7.1f}")
+    print("* the configuration in config.ini")
+    return 0
+
+
 def main():
     global app
+    if sys.argv[1:2] == ['--compare-drivers']:
+        sys.exit(compare_drivers(sys.argv[2:]))
     app = QApplication(sys.argv)
-    window = MainWindow()
+    window = MainWindow(STARTED_AT)
     window.show()
     sys.exit(app.exec_())
 
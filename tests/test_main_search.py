@@ -0,0 +1,123 @@
+import os
+import time
+import unittest
+from unittest import mock
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QEventLoop, QThreadPool
+from PyQt5.QtWidgets import QApplication
+
+import main
+
+
+class FakeCursor:
+    def __init__(self):
+        self.description = None
+
+    def execute(self, query, params=None):
+        pass
+
+    def fetchall(self):
+        return []
+
+    def fetchmany(self, size=None):
+        return []
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class FakeConnection:
+    def cursor(self, cursor_class=None):
+        return FakeCursor()
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def ping(self, reconnect=False):
+        pass
+
+    def thread_id(self):
+        return 1
+
+    def close(self):
+        pass
+
+
+def package_rows(customers, packages):
+    # (Col1 customer, Col2 active, Col3 package, Col4 description, Col5 expiration, Col6 distribution, Col7 type)
+    return sorted(((customer, b'\x01', package, f"package {package}", None, b'\x00', 1)
+                   for customer in customers for package in packages), key=lambda row: (row[2], row[0]))
+
+
+class MainSearchPagingTest(unittest.TestCase):
+    PAGE_SIZE = 4
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+        main.app = cls.app
+
+    def setUp(self):
+        patcher = mock.patch.object(main.pymysql, 'connect', lambda **kwargs: FakeConnection())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.window = main.MainWindow()
+        self.addCleanup(self.window.close)
+        self.window.search_settings['page_size'] = self.PAGE_SIZE
+        self.wait()
+
+    def wait(self, until=lambda: True, timeout=5):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            self.app.processEvents(QEventLoop.AllEvents, 50)
+            if QThreadPool.globalInstance().activeThreadCount() == 0 and until():
+                self.app.processEvents()
+                return
+            time.sleep(0.01)
+        self.fail("timed out waiting for the search")
+
+    def page_source(self, rows):
+        # fetch_page(after) as the keyset queries answer it: the next rows after the (Col3, Col1) key
+        def fetch_page(after):
+            remaining = [row for row in rows if after is None or (row[2], row[0]) > after]
+            return main.ResultRows(remaining[:self.PAGE_SIZE])
+
+        return fetch_page
+
+    def test_pages_arrive_in_key_order(self):
+        rows = package_rows(customers=[1199, 7, 300], packages=[20, 5, 11])
+        search = lambda: self.window.main_search
+        self.window.run_main_search("package", [("Source1", self.page_source(rows), lambda: len(rows))])
+        self.wait(lambda: not search()['pending'])
+        while not all(state['done'] for state in search()['sources'].values()):
+            self.window.load_more_main_results()
+            self.wait(lambda: not search()['pending'])
+
+        table = self.window.result_table
+        shown = [(table.row_values(row)[2], table.row_values(row)[0]) for row in range(table.rowCount())]
+        self.assertEqual(shown, [(row[2], row[0]) for row in rows])
+
+    def test_new_search_clears_the_view_sort(self):
+        table = self.window.result_table
+        table.horizontalHeader().setSortIndicator(0, main.Qt.DescendingOrder)
+        rows = package_rows(customers=[1199, 7], packages=[3])
+        self.window.run_main_search("package", [("Source1", self.page_source(rows), lambda: len(rows))])
+        self.wait(lambda: not self.window.main_search['pending'])
+
+        self.assertEqual(table.horizontalHeader().sortIndicatorSection(), -1)
+        self.assertEqual([table.row_values(row)[0] for row in range(table.rowCount())], [7, 1199])
+
+
+if __name__ == '__main__':
+    unittest.main()